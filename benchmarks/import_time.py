@@ -0,0 +1,75 @@
+''' Measures how long importing html_renderer (and the modules a render needs) takes
+
+Each module is imported in a fresh interpreter with ``python -X importtime``, ``--runs``
+times, after one run to write the bytecode caches. The median time of each is reported,
+along with the modules which took longest to import themselves (not counting their imports).
+
+Usage: ``python benchmarks/import_time.py [--runs N] [--top N] [--json] [module ...]``
+'''
+
+import json
+import subprocess
+import sys
+from argparse import ArgumentParser
+from collections import defaultdict
+from os import environ
+from os.path import abspath, dirname
+from statistics import median
+
+ROOT = dirname(dirname(abspath(__file__)))
+MODULES = ('html_renderer', 'html_renderer.parser', 'html_renderer.tags')
+
+
+def import_times(module: str) -> dict[str, tuple[int, int]]:
+    ''' Imports ``module`` in a new interpreter, returning the self and cumulative microseconds of every import '''
+    env = dict(environ, PYTHONPATH=ROOT)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        env=env, cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(self_us), int(cumulative_us)
+    return times
+
+
+def measure(module: str, runs: int, top: int) -> dict:
+    import_times(module)
+    totals, selves = [], defaultdict(list)
+    for _ in range(runs):
+        times = import_times(module)
+        totals.append(times[module][1])
+        for name, (self_us, _) in times.items():
+            selves[name].append(self_us)
+    slowest = sorted(((median(v), k) for k, v in selves.items()), reverse=True)[:top]
+    return {
+        'median_us': median(totals),
+        'min_us': min(totals),
+        'slowest': [{'module': name, 'self_us': us} for us, name in slowest],
+    }
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('modules', nargs='*', default=MODULES)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--top', type=int, default=5, help='how many of the slowest modules to list')
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    args = parser.parse_args()
+
+    results = {module: measure(module, args.runs, args.top) for module in args.modules}
+    if args.json:
+        print(json.dumps({'python': sys.version.split()[0], 'runs': args.runs, 'results': results}, indent=2))
+        return
+    for module, r in results.items():
+        print(f'{module:>24}: {r["median_us"] / 1000:7.2f} ms (min {r["min_us"] / 1000:.2f} ms)')
+        for slow in r['slowest']:
+            print(f'{"":>26}{slow["self_us"] / 1000:7.2f} ms  {slow["module"]}')
+
+
+if __name__ == '__main__':
+    main()
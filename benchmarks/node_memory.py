@@ -0,0 +1,98 @@
+''' Compares the memory used by parsed trees in the current node layout and the old one
+
+The old layout gave every ``Tag`` and ``Text`` a ``__dict__``, a ``children`` list and a
+``class`` list, whether or not they were used. It's reproduced here by ``LegacyTag`` and
+``LegacyText``, so the two can be measured side by side.
+
+Usage: ``python benchmarks/node_memory.py [--elements N] [--json]``
+'''
+
+import json
+import tracemalloc
+from argparse import ArgumentParser
+from os.path import abspath, dirname
+from sys import path
+
+path.insert(0, dirname(dirname(abspath(__file__))))
+
+from html_renderer.tag import Tag, Text
+
+
+class LegacyTag:
+    type: str = None
+
+    def __init__(self, *, attrs: dict = None):
+        self.attrs = attrs or {}
+        if 'class' in attrs:
+            if isinstance(attrs['class'], str):
+                attrs['class'] = attrs['class'].split(' ')
+        else:
+            attrs['class'] = []
+        self.children = []
+        if not self.type: self.type = self.__class__.__name__.lower()
+
+    def add_child(self, child):
+        self.children.append(child)
+
+
+class LegacyText:
+    def __init__(self, content: str = ''):
+        self.content = content
+
+
+class Div(Tag): __slots__ = ()
+class LegacyDiv(LegacyTag): type = 'div'
+
+
+def build(tag: type, text: type, elements: int, fan_out: int = 8):
+    ''' Builds a tree of ``elements`` tags, ``fan_out`` to a parent, with text in every other leaf '''
+    root = tag(attrs={'tagtype': 'div'})
+    parents, count = [root], 1
+    while count < elements:
+        children = []
+        for parent in parents:
+            for i in range(fan_out):
+                if count >= elements: break
+                attrs = {'tagtype': 'div', 'id': f'n{count}'}
+                if i % 2: attrs['class'] = 'item odd'
+                child = tag(attrs=attrs)
+                if i % 2: child.add_child(text(content=f'text {count}'))
+                parent.add_child(child)
+                children.append(child)
+                count += 1
+        parents = children
+    return root
+
+
+def measure(tag: type, text: type, elements: int) -> dict:
+    tracemalloc.start()
+    tree = build(tag, text, elements)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tree
+    return {'bytes': current, 'peak_bytes': peak, 'bytes_per_element': current / elements}
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--elements', type=int, default=50_000)
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    args = parser.parse_args()
+
+    results = {
+        'elements': args.elements,
+        'legacy': measure(LegacyDiv, LegacyText, args.elements),
+        'slots': measure(Div, Text, args.elements),
+    }
+    results['saving'] = 1 - results['slots']['bytes'] / results['legacy']['bytes']
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for layout in ('legacy', 'slots'):
+        r = results[layout]
+        print(f'{layout:>8}: {r["bytes"] / 1024 / 1024:8.2f} MiB  ({r["bytes_per_element"]:.0f} B per element)')
+    print(f'{"saving":>8}: {results["saving"]:8.1%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+''' Times rendering, parsing, serializing and populating synthetic templates
+
+The templates are generated into a temporary directory: one page of ``--elements`` tags,
+nested up to ``--depth`` deep, including ``--includes`` partials, with a ``--placeholders``
+share of text nodes using the context, and a ``--custom`` share of tags with handlers.
+Each operation is timed separately, and its peak memory measured with ``tracemalloc``.
+
+Usage: ``python benchmarks/render.py [--elements N] [--repeat N] [--json] [--output FILE]``
+'''
+
+import json
+import platform
+import tracemalloc
+from argparse import ArgumentParser
+from collections import defaultdict
+from os import makedirs
+from os.path import abspath, dirname, join
+from random import Random
+from sys import path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Callable
+
+path.insert(0, dirname(dirname(abspath(__file__))))
+
+from html_renderer import ContextItem, _Renderer
+from html_renderer.parser import Parser
+
+PLAIN_TAGS = ('div', 'span', 'p', 'li', 'em')
+CUSTOM_TAGS = ('row', 'column', 'content', 'paragraph', 'hero', 'navlink')
+CONTEXT = {'title': 'Benchmark', **{f'var{i}': f'value {i}' for i in range(10)}}
+
+
+def generate(
+    directory: str, elements: int = 2_000, depth: int = 6, includes: int = 4,
+    placeholders: float = 0.3, custom: float = 0.3, seed: int = 0
+) -> str:
+    ''' Writes a synthetic page, and the partials it includes, to ``directory``
+
+    Returns the page's file name, relative to ``directory``.
+    '''
+    random = Random(seed)
+    makedirs(join(directory, 'templates', 'includes'), exist_ok=True)
+
+    def text() -> str:
+        if random.random() < placeholders:
+            return f'text {{{{ var{random.randrange(10)} }}}} more'
+        return 'static text'
+
+    def tree(count: int, level: int) -> str:
+        out = []
+        while count > 0:
+            tag = random.choice(CUSTOM_TAGS if random.random() < custom else PLAIN_TAGS)
+            attrs = f' href="/{count}"' if tag == 'navlink' else f' class="c{count % 7}"'
+            children = random.randint(0, min(count - 1, 8)) if level < depth else 0
+            out.append(f'<{tag}{attrs}>{text()}{tree(children, level + 1)}</{tag}>')
+            count -= children + 1
+        return ''.join(out)
+
+    share = elements // (includes + 1)
+    for i in range(includes):
+        with open(join(directory, 'templates', 'includes', f'part{i}.shtml'), 'w') as f:
+            f.write(tree(share, 1))
+    parts = ''.join(f'<include src="includes/part{i}.shtml"/>' for i in range(includes))
+    with open(join(directory, 'page.html'), 'w') as f:
+        f.write(f'<!DOCTYPE html><html><head><title/></head><body>{tree(elements - share * includes, 1)}{parts}</body></html>')
+    return 'page.html'
+
+
+def measure(func: Callable[[], object], repeat: int) -> dict:
+    ''' Times ``repeat`` calls of ``func`` (after a warm up call), then measures the peak memory of one more '''
+    func()
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        func()
+        times.append(perf_counter() - start)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'best_seconds': min(times), 'mean_seconds': sum(times) / len(times), 'peak_bytes': peak}
+
+
+def run(directory: str, page: str, elements: int, repeat: int) -> dict:
+    def render():
+        renderer = _Renderer(context=defaultdict(ContextItem, CONTEXT), templates_path=directory)
+        renderer.render(page)
+        return renderer.out.read()
+
+    with open(join(directory, page)) as f:
+        source = f.read()
+
+    def parse():
+        parser = Parser()
+        parser.parse_text(source)
+        return parser.result
+
+    tree = parse()
+    populator = _Renderer(context=defaultdict(ContextItem, CONTEXT))
+    texts = [f'text {{{{ var{i % 10} }}}} &amp; more' for i in range(elements)]
+
+    results = {
+        'render': measure(render, repeat),
+        'parse': measure(parse, repeat),
+        'str': measure(lambda: str(tree), repeat),
+        'populate': measure(lambda: [populator.populate(t) for t in texts], repeat),
+    }
+    sizes = {'render': len(render()), 'parse': len(source), 'str': len(str(tree)), 'populate': sum(map(len, texts))}
+    for name, result in results.items():
+        result['chars'] = sizes[name]
+        result['chars_per_second'] = sizes[name] / result['best_seconds']
+    return results
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--elements', type=int, default=2_000)
+    parser.add_argument('--depth', type=int, default=6)
+    parser.add_argument('--includes', type=int, default=4)
+    parser.add_argument('--placeholders', type=float, default=0.3, help='share of text using placeholders')
+    parser.add_argument('--custom', type=float, default=0.3, help='share of tags with handlers')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as directory:
+        page = generate(directory, args.elements, args.depth, args.includes, args.placeholders, args.custom, args.seed)
+        results = {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'parameters': {k: v for k, v in vars(args).items() if k not in ('json', 'output')},
+            'results': run(directory, page, args.elements, args.repeat),
+        }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, r in results['results'].items():
+        print(
+            f'{name:>8}: {r["best_seconds"] * 1000:9.2f} ms  {r["chars_per_second"] / 1e6:7.2f} M chars/s'
+            f'  peak {r["peak_bytes"] / 1024:9.1f} KiB'
+        )
+
+
+if __name__ == '__main__':
+    main()
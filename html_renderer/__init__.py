@@ -1,54 +1,65 @@
-import sys
 from collections import defaultdict
-from functools import wraps
+from functools import lru_cache, wraps
 from html.parser import HTMLParser
 from itertools import chain
 from os.path import join
-from queue import LifoQueue as Queue
-from typing import Callable, Iterable, NewType, Optional
-from re import sub, compile as re_compile, escape as re_escape
+from queue import Empty, LifoQueue as Queue, Queue as FifoQueue
+from threading import Event, Thread
+from types import MappingProxyType
+from typing import Callable, Iterable, Iterator, NewType, Optional, Union
+from re import compile as re_compile, escape as re_escape
 
 from .utils import load_charrefs, get_parameters, TEMPLATES_PATH
 from .environment import Environment
+from .cache import BytecodeCache, Fragment, FragmentCache, SourceCache, bytecode_cache, fragment_cache, source_cache
+from .compiler import _signature, compile_template
+from .context import Context, ContextItem, _RecordingContext
 
 
-class ContextItem:
-    def __init__(self, k='', v=''):
-        self.raw_k = k
-        self.k = k
-        self.raw_v = v
-        self.v = v
+strs = Iterable[str]
+map_strstr = dict[str, str]
+Dependencies = NewType('Dependencies', defaultdict[Optional[str], set[str]])
+_TagRenderer = NewType('_TagRenderer', object)
+_tag_end_func = Callable[[_TagRenderer], str]
 
-    @property
-    def k(self):
-        return self.search
+_PLACEHOLDER = r'\{\{ *(?P<name>[^{}]*?) *\}\}|\{\&[ a-zA-Z\-_]+\&\}'
+_UNRESOLVED = re_compile(r'\{\{[ a-zA-Z\-_]+\}\}|\{\&[ a-zA-Z\-_]+\&\}')
 
-    @k.setter
-    def k(self, k):
-        self.search = re_compile(f'\\{{\\{{ *{k} *\\}}\\}}')
 
-    @property
-    def v(self):
-        return self.value
+_NAMED_CHARREF = r'&[A-Za-z][A-Za-z0-9]*;'
 
-    @v.setter
-    def v(self, v):
-        self.value = re_escape(v)
 
+@lru_cache(maxsize=None)
+def _compile_matchers(charrefs: Optional[tuple[str, ...]]):
+    ''' Builds the single-pass matchers used by ``_RendererBase.populate``
 
-strs = Iterable[str]
-map_strstr = dict[str, str]
-Context = NewType('Context', defaultdict[str, ContextItem])
-_TagRenderer = NewType('_TagRenderer', object)
-_tag_end_func = Callable[[_TagRenderer], str]
+    Returns a matcher for placeholders and charrefs together, and one for charrefs alone.
+    ``charrefs`` is ``None`` for the standard table, which is matched by the shape of a named
+    reference and looked up, rather than by listing every name.
+    '''
+    if charrefs is None:
+        charref = _NAMED_CHARREF
+    else:
+        charref = '|'.join(re_escape(c) for c in sorted(charrefs, key=len, reverse=True)) or '(?!)'
+    return (
+        re_compile(f'{_PLACEHOLDER}|(?P<charref>{charref})'),
+        re_compile(f'(?P<charref>{charref})'),
+    )
 
 
 class _RenderStream:
+    ''' The writer a render's output goes to
+
+    Chunks are kept as written, and separated by newlines when read back.
+    '''
+
     def __init__(self):
         self.data = []
 
     def __iter__(self):
-        return self.data
+        for i, chunk in enumerate(self.data):
+            if i: yield '\n'
+            yield chunk
 
     def __next__(self):
         return next(self.data)
@@ -68,87 +79,202 @@ class _RenderStream:
         print(self.read())
 
 
+class _ChunkedRenderStream(_RenderStream):
+    ''' A render stream which passes its output on to ``send`` as it's written
+
+    Writes are buffered until there are at least ``chunk_size`` characters, then sent as one
+    chunk, newline separated as ``read`` would have joined them. ``flush`` sends what's left.
+    '''
+
+    def __init__(self, send: Callable[[str], None], chunk_size: int = 16 * 1024):
+        super().__init__()
+        self.send = send
+        self.chunk_size = chunk_size
+        self.size = 0
+        self.started = False
+
+    def write(self, s):
+        if self.started:
+            self.data.append('\n')
+        self.started = True
+        self.data.append(s)
+        self.size += len(s) + 1
+        if self.size >= self.chunk_size:
+            self.flush()
+
+    def read(self):
+        return ''.join(self.data)
+
+    def flush(self):
+        if self.data:
+            chunk = self.read()
+            self.data = []
+            self.size = 0
+            self.send(chunk)
+
+
+class _RenderCancelled(Exception): pass
+
+
+def _flatten(handler, kind: str) -> Callable:
+    ''' Turns a tuple of handlers into one function, which joins their output with spaces '''
+    if not isinstance(handler, Iterable):
+        return handler
+    handlers = tuple(handler)
+    if kind == 'start':
+        return lambda self, attrs: ' '.join(f(self, attrs) for f in handlers)
+    if kind == 'end':
+        return lambda self: ' '.join(f(self) for f in handlers)
+    calls = tuple((f, '_start' in f.__name__) for f in handlers)
+    return lambda self, attrs: ' '.join(f(self, attrs) if takes_attrs else f(self) for f, takes_attrs in calls)
+
+
 class _RendererBase(HTMLParser):
-    def __init__(self, context: Optional[Context] = None, blocks=None) -> None:
+    ''' Renders templates, dispatching each tag to the ``_handle_{tag}[_start|_end]`` handler for it, if any
+
+    The handlers are looked up once per class, into the ``starts``, ``ends`` and ``startends``
+    tables, which map tag names (with ``-`` or ``_``) to plain functions: start and start-end
+    handlers take ``(renderer, attrs)`` and end handlers ``(renderer)``. Handlers added to a
+    class after it's created need its tables rebuilding, with ``build_dispatch``.
+
+    Start handlers marked ``_guards_body`` return whether to render the tag's body rather than
+    output; when a template is fed in directly, a body they turn down is skipped to its end tag.
+    '''
+
+    sources: SourceCache = source_cache
+    bytecode: BytecodeCache = bytecode_cache
+    starts = ends = startends = MappingProxyType({})
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        cls.build_dispatch()
+
+    @classmethod
+    def build_dispatch(cls) -> None:
+        tables = {'start': {}, 'end': {}, 'startend': {}}
+        for name in dir(cls):
+            if not name.startswith('_handle_') or (handler := getattr(cls, name)) is None:
+                continue
+            if isinstance(next(vars(c)[name] for c in cls.__mro__ if name in vars(c)), (staticmethod, classmethod)):
+                handler = wraps(handler)(lambda _, *args, handler=handler: handler(*args))
+            tag = name[len('_handle_'):]
+            entries = [('startend', tag)]
+            for kind in ('start', 'end'):
+                if tag.endswith('_' + kind):
+                    entries.append((kind, tag[:-len(kind) - 1]))
+            for kind, tag in entries:
+                tables[kind][tag] = tables[kind][tag.replace('_', '-')] = _flatten(handler, kind)
+        cls.starts, cls.ends, cls.startends = (MappingProxyType(tables[k]) for k in ('start', 'end', 'startend'))
+        _signature.cache_clear()
+
+    def __init__(
+        self, context: Optional[Context] = None, blocks=None, out: Optional[_RenderStream] = None,
+        templates_path: Optional[str] = None, dependencies: Optional[Dependencies] = None,
+        decode_charrefs: bool = True
+    ) -> None:
         super().__init__(convert_charrefs=False)
-        self.context: Context = context or self.default_context()
-        for k, v in self.context.items():
-            if isinstance(v, ContextItem): v = v.raw_v
-            self.context[k] = ContextItem(k, v.replace('%20', ' ').replace('%27', '\''))
+        self.templates_path = templates_path or TEMPLATES_PATH
+        self.charrefs = load_charrefs()
+        self.decode_charrefs = decode_charrefs
+        self._matchers = None
+        self.prepare(context=context, blocks=blocks, out=out, dependencies=dependencies)
+
+    def prepare(
+        self, context: Optional[Context] = None, blocks=None, out: Optional[_RenderStream] = None,
+        dependencies: Optional[Dependencies] = None
+    ) -> None:
+        ''' Resets all per-render state, so the renderer can be reused for another render
+
+        ``dependencies`` is shared with every renderer an include creates, and maps the path of
+        each template rendered to the paths of the templates it pulled in.
+        '''
+        self.reset()
+        self.path = None
+        self.dependencies = dependencies if dependencies is not None else defaultdict(set)
+        if not isinstance(context, Context):
+            context = Context(context) if context else self.default_context()
+        self.context: Context = context
         self.accordions = []
-        self.blocks = blocks or defaultdict(_RenderStream)
+        self.blocks = blocks if blocks is not None else defaultdict(_RenderStream)
         self.block_names = []
-        self.charrefs = load_charrefs()
         self.codes = None
+        self.skipping = None
         self.extends = Queue()
+        self.out = out if out is not None else _RenderStream()
+        self.outs = []
+        self._substitutions = None
+        self._substitutions_version = None
 
     def handle_startendtag(self, tagname: str, attrs: list[tuple[str, Optional[str]]]) -> None:
-        attrs = dict(attrs)
-        handler = '_handle_' + tagname.replace('-', '_')
-        if hasattr(self, handler):
-            handler_func = getattr(self, handler)
-            if isinstance(handler_func, Iterable):
-                tag = ' '.join(f(self, attrs) if '_start' in f.__name__ else f(
-                    self) for f in handler_func)
-            else:
-                tag = handler_func(attrs)
-        else:
-            tag = self.make_tag_startend(tagname, attrs)
+        if self.skipping: return
+        handler = self.startends.get(tagname)
+        tag = handler(self, dict(attrs)) if handler else self.make_tag_startend(tagname, dict(attrs))
         if tag is not None:
-            print(tag)
+            self.out.write(tag)
 
     def handle_starttag(self, tagname: str, attrs: list[tuple[str, Optional[str]]]) -> None:
-        attrs = dict(attrs)
-        handler = '_handle_' + tagname.replace('-', '_') + '_start'
-        if hasattr(self, handler):
-            handler_func = getattr(self, handler)
-            if isinstance(handler_func, Iterable):
-                tag = ' '.join(f(self, attrs) for f in handler_func)
-            else:
-                tag = handler_func(attrs)
-        else:
-            tag = self.make_tag_start(tagname, attrs)
-        if tag is not None:
-            print(tag)
+        if self.skipping:
+            if self.skipping[0] == tagname: self.skipping[1] += 1
+            return
+        handler = self.starts.get(tagname)
+        tag = handler(self, dict(attrs)) if handler else self.make_tag_start(tagname, dict(attrs))
+        if getattr(handler, 'guards_body', False):
+            if not tag: self.skipping = [tagname, 1]
+        elif tag is not None:
+            self.out.write(tag)
 
     def handle_endtag(self, tagname: str) -> None:
-        handler = '_handle_' + tagname.replace('-', '_') + '_end'
-        if hasattr(self, handler):
-            handler_func = getattr(self, handler)
-            if isinstance(handler_func, Iterable):
-                tag = ' '.join(f(self) for f in handler_func)
-            else:
-                tag = getattr(self, handler)()
-        else:
-            tag = self.make_tag_end(tagname)
+        if self.skipping:
+            if self.skipping[0] == tagname: self.skipping[1] -= 1
+            if self.skipping[1]: return
+            self.skipping = None
+        handler = self.ends.get(tagname)
+        tag = handler(self) if handler else self.make_tag_end(tagname)
         if tag is not None:
-            print(tag)
+            self.out.write(tag)
 
-    def handle_decl(_, decl): return print(f'<!{decl}>')
+    def handle_decl(self, decl):
+        if not self.skipping: self.out.write(f'<!{decl}>')
 
     def handle_data(self, data: str) -> None:
+        if self.skipping: return
         if self.codes:
-            self.codes['body'].append(data)
+            self.capture(data)
         else:
-            print(self.populate(data))
+            self.out.write(self.populate(data))
 
-    def handle_charref(_, name): return print(f'&#{name};')
+    def handle_charref(self, name):
+        if self.skipping: return
+        if self.codes:
+            self.capture(f'&#{name};', True)
+        else:
+            self.out.write(f'&#{name};')
+
+    def handle_entityref(self, name):
+        if self.skipping: return
+        if self.codes:
+            self.capture(f'&{name};', True)
+        else:
+            self.out.write(self.populate(f'&{name};'))
+
+    def capture(self, data: str, ref: bool = False) -> None:
+        ''' Adds text to the body a ``_captures_data`` handler is collecting
+
+        References, and the text either side of them, are kept together in one piece.
+        '''
+        body = self.codes['body']
+        if body and (ref or self.codes.get('ref')):
+            body[-1] += data
+        else:
+            body.append(data)
+        self.codes['ref'] = ref
 
     @staticmethod
     def default_context() -> Context:
-        return defaultdict(
-            ContextItem,
-            chain(
-                map(
-                    lambda x: (x[0], ContextItem(*x)),
-                    filter(
-                        lambda x: hasattr(x, '__len__') and len(x) == 2,
-                        get_parameters(method='GET')
-                    )
-                ),
-                Environment.items()
-            )
-        )
+        return Context(dict(chain(
+            filter(lambda x: hasattr(x, '__len__') and len(x) == 2, get_parameters(method='GET')),
+            Environment.items()
+        )))
 
     def include(self, *, path=None, snippet=None):
         if path:
@@ -156,14 +282,55 @@ class _RendererBase(HTMLParser):
         if snippet:
             self.render_text(snippet)
 
+    @property
+    def matchers(self):
+        if self._matchers is None:
+            if not self.decode_charrefs:
+                self._matchers = _compile_matchers(())
+            else:
+                self._matchers = _compile_matchers(None if self.charrefs is load_charrefs() else tuple(self.charrefs))
+        return self._matchers
+
+    @property
+    def substitutions(self) -> dict[str, Optional[str]]:
+        ''' The placeholder values looked up so far, with their charrefs already decoded
+
+        Filled in as placeholders are resolved, and emptied whenever the context changes.
+        '''
+        if self._substitutions_version != self.context.version:
+            self._substitutions = {}
+            self._substitutions_version = self.context.version
+        return self._substitutions
+
+    def substitution(self, name: str) -> Optional[str]:
+        substitutions = self.substitutions
+        try:
+            return substitutions[name]
+        except KeyError:
+            item = self.context.get(name)
+            value = substitutions[name] = None if item is None else self.matchers[1].sub(self._resolve_charref, item.raw_v)
+            return value
+
+    def invalidate(self):
+        self._substitutions_version = None
+
+    def _resolve_charref(self, match):
+        charref = match['charref']
+        return self.charrefs.get(charref, charref)
+
+    def _resolve(self, match):
+        name, charref = match.group('name', 'charref')
+        if charref is not None:
+            return self.charrefs.get(charref, charref)
+        if name is not None:
+            value = self.substitution(name)
+            if value is not None:
+                return value
+        return '' if _UNRESOLVED.fullmatch(match[0]) else match[0]
+
     def populate(self, data):
         if data and data.strip():
-            for ctxt in self.context.values():
-                data = sub(ctxt.k, ctxt.v, data)
-            for k, v in self.charrefs.items():
-                data = sub(k, v, data)
-            data = sub(r'\{\{[ a-zA-Z\-_]+\}\}', '', data)
-            data = sub(r'\{\&[ a-zA-Z\-_]+\&\}', '', data)
+            data = self.matchers[0].sub(self._resolve, data)
         return data
 
     @staticmethod
@@ -175,11 +342,14 @@ class _RendererBase(HTMLParser):
         attrs['class'] += clsname
         return attrs
         
-    def render(self, *filename):
-        with open(join(TEMPLATES_PATH, *filename), 'r') as f:
-            data = f.read()
-        self.render_text(data)
-    render_text = HTMLParser.feed
+    def render(self, *filename) -> None:
+        ''' Renders a template from ``self.templates_path`` to ``self.out`` '''
+        self.path = join(self.templates_path, *filename)
+        self.dependencies[self.path]
+        self.render_text(self.sources.read(self.path))
+
+    def render_text(self, data) -> None:
+        compile_template(data, self.__class__)(self)
 
 
 class _TagRenderer:
@@ -217,6 +387,24 @@ class _TagRenderer:
             return self.make_tag_end(func(self, *args, **kwargs))
         return wrapper
 
+    def _captures_data(func):
+        ''' Marks a start handler that collects the tag's text itself, rather than printing it '''
+        func.captures_data = True
+        return func
+
+    def _static(func):
+        ''' Marks a handler whose output depends only on its attrs, and which changes no renderer state
+
+        The compiler runs static handlers given constant attrs once, and reuses their output.
+        '''
+        func.static = True
+        return func
+
+    def _guards_body(func):
+        ''' Marks a start handler that returns whether the tag's body should be rendered, rather than output '''
+        func.guards_body = True
+        return func
+
     @staticmethod
     def get_list_tag(list_type: str) -> str:
         return {
@@ -312,72 +500,93 @@ class _TagRenderer:
         def name(self): return self.tag + '_startend'
 
     @TagStart('div')
+    @_static
     @_make_tag_start
     def div_start(*_): return 'div'
 
     @TagEnd('div')
+    @_static
     @_make_tag_end
     def div_end(_): return 'div'
 
     @TagStart('section')
+    @_static
     @_make_tag_start
     def section_start(*_): return 'section'
 
     @TagEnd('section')
+    @_static
     @_make_tag_end
     def section_end(_): return 'section'
 
     @TagStart('a')
+    @_static
     def a_start(self, attrs): return self.make_a_start(attrs)
 
     @TagEnd('a')
+    @_static
     @_make_tag_end
     def a_end(_): return 'a'
 
     @TagStart('p')
+    @_static
     @_make_tag_start
     def p_start(*_): return 'p'
         
     @TagEnd('p')
+    @_static
     @_make_tag_end
     def p_end(_): return 'p'
 
     @TagStart('list')
+    @_static
     @_make_tag_start
     def list_start(self, _, list_type): return self.get_list_tag(list_type)
 
     @TagEnd('list')
+    @_static
     @_make_tag_end
     def list_end(self, list_type): return self.get_list_tag(list_type)
 
     @TagStart('ol')
+    @_static
     @_make_tag_start
     def ol_start(*_): return 'ol'
 
     @TagEnd('ol')
+    @_static
     @_make_tag_end
     def ol_end(_): return 'ol'
 
     @TagStart('ul')
+    @_static
     @_make_tag_start
     def ul_start(*_): return 'ul'
 
     @TagEnd('ul')
+    @_static
     @_make_tag_end
     def ul_end(_): return 'ul'
 
     @TagStart('dl')
+    @_static
     @_make_tag_start
     def dl_start(*_): return 'dl'
 
     @TagEnd('dl')
+    @_static
     @_make_tag_end
     def dl_end(_): return 'dl'
 
 
 class _Renderer(_RendererBase, _TagRenderer):
-    def __init__(self, context: Optional[Context] = None, blocks=None) -> None:
-        super().__init__(context=context, blocks=blocks)
+    fragments: FragmentCache = fragment_cache
+
+    def prepare(
+        self, context: Optional[Context] = None, blocks=None, out: Optional[_RenderStream] = None,
+        dependencies: Optional[Dependencies] = None
+    ) -> None:
+        super().prepare(context=context, blocks=blocks, out=out, dependencies=dependencies)
         self.tags = defaultdict(Queue)
 
     @staticmethod
@@ -393,6 +602,7 @@ class _Renderer(_RendererBase, _TagRenderer):
         k) for k in attributes if not filter or attrs.get(k, NameError) != NameError}
 
     @_TagRenderer.TagStart('codelike')
+    @_TagRenderer._captures_data
     def make_codelike_start(self, attrs):
         self.codes = {'attrs': attrs, 'body': []}
 
@@ -405,6 +615,7 @@ class _Renderer(_RendererBase, _TagRenderer):
         return self.make_tag_start(tag, code['attrs']) + self.populate('\n'.join(body)) + self.make_tag_end(tag)
 
     @_TagRenderer.TagStartEnd('meta')
+    @_TagRenderer._static
     def _meta(self, attrs, name):
         return self.make_tag_startend(
             'meta', self.make_attrs(attrs, name=name))
@@ -413,6 +624,7 @@ class _Renderer(_RendererBase, _TagRenderer):
     def _includer(self, _, path):
         return self.include(path=path)
 
+    @_TagRenderer._static
     def _handle_stylesheet(self, attrs):
         return self.make_tag_startend(
             'link',
@@ -420,12 +632,14 @@ class _Renderer(_RendererBase, _TagRenderer):
                             type='text/css', media='all')
         )
 
+    @_TagRenderer._static
     def _handle_extscript(self, attrs):
         return self.make_tag_start(
             'script',
             self.make_attrs(attrs, type='text/javascript')
         ) + self.make_tag_end('script')
 
+    @_TagRenderer._static
     def _handle_favicon(self, attrs):
         return self.make_tag_startend(
             'link',
@@ -433,6 +647,7 @@ class _Renderer(_RendererBase, _TagRenderer):
                 attrs, href='/dashboard/images/favicon.png', rel='icon', type='image/png')
         )
 
+    @_TagRenderer._static
     def _handle_analytics(self, _):
         div = _TagRenderer.div_start(id='fb-root')(self, {}) + _TagRenderer.div_end()(self)
         script = self._handle_extscript(
@@ -477,6 +692,7 @@ class _Renderer(_RendererBase, _TagRenderer):
 
     _handle_top = _TagRenderer.div_start(id='top'), _TagRenderer.div_end()
 
+    @_TagRenderer._static
     def _handle_navlink_start(self, attrs):
         attrs = self.make_attrs(attrs, cls='')
         li = self.make_tag_start(
@@ -485,6 +701,7 @@ class _Renderer(_RendererBase, _TagRenderer):
         a = self.make_a_start(a_attrs)
         return li + a
 
+    @_TagRenderer._static
     def _handle_navlink_end(self):
         return self.make_tag_end('a') + self.make_tag_end('li')
 
@@ -502,6 +719,7 @@ class _Renderer(_RendererBase, _TagRenderer):
 
     _handle_a_start = _TagRenderer.a_start()
 
+    @_TagRenderer._static
     def _handle_menu_toggle(self, _):
         li_start = self.make_tag_start(
             'li', {'class': 'toggle-topbar menu-icon'})
@@ -513,6 +731,7 @@ class _Renderer(_RendererBase, _TagRenderer):
         li_end = self.make_tag_end('li')
         return li_start + a_start + span_start + menu + span_end + a_end + li_end
 
+    @_TagRenderer._static
     def _handle_viewport(self, attrs):
         attrs = self.make_attrs(
             attrs, width='device-width', initial_scale='1.0')
@@ -533,14 +752,21 @@ class _Renderer(_RendererBase, _TagRenderer):
     def _handle_set(self, attrs):
         for k, v in attrs.items():
             self.context[k] = ContextItem(k, self.populate(v))
-            # re_compile(f'\\{{\\{{ *{k} *\\}}\\}}'), re_escape(v)
 
     def _handle_include(self, attrs):
         attrs = self.make_attrs(attrs)
         path = 'templates/' + attrs['src']
         path_parts = (p for p in path.split('/') if p)
-        self.__class__(context=self.context,
-                       blocks=self.blocks).render(*path_parts)
+        renderer = self.__class__(context=self.context, blocks=self.blocks, out=self.out,
+                                  templates_path=self.templates_path, dependencies=self.dependencies,
+                                  decode_charrefs=self.decode_charrefs)
+        renderer.render(*path_parts)
+        self.dependencies[self.path].add(renderer.path)
+
+    def _handle_include_start(self, attrs):
+        return self._handle_include(attrs)
+
+    def _handle_include_end(self): pass
 
     def _handle_title(self, _):
         return self.make_tag_start('title') + self.context.get('title', '').raw_v + self.make_tag_end('title')
@@ -558,17 +784,71 @@ class _Renderer(_RendererBase, _TagRenderer):
         return self.accordions.pop()
 
     def _handle_block(self, attrs):
-        return self.blocks[attrs['name']].print()
+        return self.blocks[attrs['name']].read()
 
     def _handle_block_start(self, attrs):
         name = attrs['name']
         self.block_names.append(name)
         self.blocks[name] = _RenderStream()
-        sys.stdout = self.blocks[name]
-
-    @staticmethod
-    def _handle_block_end():
-        sys.stdout = sys.__stdout__
+        self.outs.append(self.out)
+        self.out = self.blocks[name]
+
+    def _handle_block_end(self):
+        self.out = self.outs.pop()
+
+    @_TagRenderer._guards_body
+    def _handle_cache_start(self, attrs):
+        ''' Splices in the fragment cached under ``key``, or renders the body to cache it
+
+        ``ttl`` is in seconds (the default is forever), and ``vary`` names the context
+        variables whose values are part of the key. The templates the body includes are
+        cached with the fragment, and added to ``dependencies`` whenever it's spliced in, as
+        are the values it ``<set>`` and the ``<block>`` contents it defined.
+        '''
+        key = self.populate(attrs['key'])
+        for name in (attrs.get('vary') or '').replace(',', ' ').split():
+            item = self.context.get(name)
+            key += f'\0{name}={item.raw_v if item is not None else ""}'
+        fragment = self.fragments.get(key)
+        if fragment is not None:
+            self.tags['cache'].put(None)
+            for parent, child in fragment.dependencies:
+                self.dependencies[self.path if parent is None else parent].add(child)
+            for name, value in fragment.context:
+                self.context[name] = value
+            for name, text in fragment.blocks:
+                self.blocks[name] = block = _RenderStream()
+                block.write(text)
+            self.out.write(fragment.text)
+            return False
+        ttl = attrs.get('ttl')
+        self.tags['cache'].put((key, float(ttl) if ttl else None, self.dependencies, self.context, dict(self.blocks)))
+        self.outs.append(self.out)
+        self.out = _RenderStream()
+        self.dependencies = defaultdict(set)
+        self.context = _RecordingContext(self.context)
+        return True
+
+    def _handle_cache_end(self):
+        entry = self.tags['cache'].get()
+        if entry is None:
+            return None
+        key, ttl, dependencies, context, blocks = entry
+        edges = []
+        for parent, children in self.dependencies.items():
+            dependencies[parent] |= children
+            edges.extend((None if parent == self.path else parent, child) for child in sorted(children))
+        sets = self.context.sets
+        for name, item in sets.items():
+            context[name] = item
+        # Defining a block replaces its stream, while using an undefined one only adds an empty stream
+        defined = tuple(
+            (name, block.read()) for name, block in self.blocks.items()
+            if block is not blocks.get(name) and (name in blocks or block.data)
+        )
+        text, self.out, self.dependencies, self.context = self.out.read(), self.outs.pop(), dependencies, context
+        self.fragments.put(key, Fragment(text, tuple(edges), tuple((k, v.raw_v) for k, v in sets.items()), defined), ttl)
+        return text
 
     def _handle_extends_start(self, attrs):
         return self.extends.put(attrs)
@@ -607,5 +887,64 @@ class _Renderer(_RendererBase, _TagRenderer):
         _TagRenderer.section_end()(self)
 
 
-def render(*filename):
-    _Renderer().render(*filename)
+def render(*filename, encoding: Optional[str] = None) -> Union[str, bytes]:
+    ''' Renders a template from ``TEMPLATES_PATH``, returning it as a string, or as bytes if an ``encoding`` is given '''
+    renderer = _Renderer()
+    renderer.render(*filename)
+    output = renderer.out.read()
+    return output if encoding is None else output.encode(encoding)
+
+
+def iter_render(
+    *filename, chunk_size: int = 16 * 1024, encoding: str = 'utf-8', context: Optional[Context] = None
+) -> Iterator[bytes]:
+    ''' Renders a template from ``TEMPLATES_PATH``, yielding its output encoded, in chunks of around ``chunk_size`` characters
+
+    The render runs on its own thread, which is kept no more than a couple of chunks ahead,
+    so each chunk is yielded as soon as it's written and the page is never held whole. Only
+    ``<block>`` content is held back, until the ``<extends>`` base using it gets that far.
+    Closing the generator early stops the render.
+    '''
+    chunks = FifoQueue(maxsize=2)
+    cancelled = Event()
+    done = object()
+
+    def send(chunk: str) -> None:
+        if cancelled.is_set():
+            raise _RenderCancelled
+        chunks.put(chunk.encode(encoding))
+
+    def run() -> None:
+        try:
+            renderer = _Renderer(context=context, out=_ChunkedRenderStream(send, chunk_size))
+            renderer.render(*filename)
+            renderer.out.flush()
+        except _RenderCancelled:
+            return
+        except BaseException as e:
+            chunks.put(e)
+        chunks.put(done)
+
+    worker = Thread(target=run, daemon=True)
+    worker.start()
+    try:
+        while (chunk := chunks.get()) is not done:
+            if isinstance(chunk, BaseException):
+                raise chunk
+            yield chunk
+    finally:
+        cancelled.set()
+        while worker.is_alive():
+            try:
+                chunks.get(timeout=0.01)
+            except Empty:
+                pass
+
+
+def __getattr__(name: str):
+    ''' Imports ``pool`` (and ``concurrent.futures``) the first time its exports are used '''
+    if name in ('RendererPool', 'render_many'):
+        from . import pool
+        value = globals()[name] = getattr(pool, name)
+        return value
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
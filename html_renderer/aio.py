@@ -0,0 +1,159 @@
+''' Rendering from asyncio
+
+Before a render starts, the template and the templates it includes are read into the source
+cache by ``preload``, which only hands the file reads to the default executor, so the render
+never waits on a file. Context values may be awaitables, which are all awaited concurrently,
+while the sources load.
+
+Handlers and compiled templates are synchronous, so a render can't stop partway through to
+await anything. ``render_async`` runs it on the event loop itself, since it doesn't block on
+I/O. ``iter_render_async`` runs it on a thread of its own, as ``iter_render`` does, kept a
+couple of chunks ahead of the consumer, so each chunk is yielded as soon as it's written.
+'''
+
+from asyncio import Queue, gather, get_running_loop, run_coroutine_threadsafe, sleep, to_thread
+from html.parser import HTMLParser
+from inspect import isawaitable
+from os.path import join
+from threading import Event, Thread
+from typing import AsyncIterator, Iterator, Mapping, Optional, Union
+
+from . import Context, _ChunkedRenderStream, _RenderCancelled, _Renderer
+from .cache import LRUCache, SourceCache
+from .utils import TEMPLATES_PATH
+
+_found = LRUCache(256)
+
+
+async def resolve_context(context: Optional[Mapping]) -> Optional[Context]:
+    ''' Copies a caller's context, with every awaitable value replaced by its result '''
+    if context is None:
+        return None
+    pending = {k: v for k, v in context.items() if isawaitable(v)}
+    resolved = dict(zip(pending, await gather(*pending.values())))
+    return Context({k: resolved.get(k, v) for k, v in context.items()})
+
+
+class _Includes(HTMLParser):
+    ''' Finds the templates a template pulls in with ``<include>``, ``<extends>``, ``<header/>`` and ``<footer/>`` '''
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=False)
+        self.found: list[str] = []
+
+    def handle_starttag(self, tagname: str, attrs: list[tuple[str, Optional[str]]]) -> None:
+        if tagname == 'extends':
+            self.found.append(dict(attrs).get('base', 'base.html'))
+        elif tagname == 'include':
+            self.found.append(dict(attrs).get('src') or '')
+
+    def handle_startendtag(self, tagname: str, attrs: list[tuple[str, Optional[str]]]) -> None:
+        if tagname == 'include':
+            self.found.append(dict(attrs).get('src') or '')
+        elif tagname in ('header', 'footer'):
+            self.found.append(f'/includes/{tagname}.shtml')
+
+def includes(source: str, templates_path: str) -> Iterator[str]:
+    ''' Yields the paths of the templates ``source`` includes, as ``_Renderer`` would resolve them
+
+    Includes whose ``src`` uses placeholders can't be known before rendering, so are skipped.
+    What each source includes is remembered, so a template isn't scanned again on every render.
+    '''
+    found = _found.get(source)
+    if found is None:
+        parser = _Includes()
+        parser.feed(source)
+        parser.close()
+        found = tuple(parser.found)
+        _found.put(source, found)
+    for src in found:
+        if src and '{' not in src:
+            yield join(templates_path, *(p for p in ('templates/' + src).split('/') if p))
+
+
+async def preload(*filename, templates_path: Optional[str] = None, sources: Optional[SourceCache] = None) -> set[str]:
+    ''' Reads a template, and every template it includes, into ``sources`` without blocking the event loop
+
+    Returns the paths found. Files which are already cached aren't read again, and files
+    which can't be read are left for the render to report.
+    '''
+    templates_path = templates_path or TEMPLATES_PATH
+    sources = sources or _Renderer.sources
+    seen = set()
+
+    async def load(path: str) -> None:
+        if path in seen:
+            return
+        seen.add(path)
+        entry = sources.entries.get(path)
+        try:
+            source = entry[1] if entry is not None else await to_thread(sources.read, path)
+        except OSError:
+            return
+        await gather(*map(load, includes(source, templates_path)))
+
+    await load(join(templates_path, *filename))
+    return seen
+
+
+async def _prepare(filename: tuple[str, ...], context: Optional[Mapping], templates_path: Optional[str]) -> Optional[Context]:
+    context, _ = await gather(resolve_context(context), preload(*filename, templates_path=templates_path))
+    return context
+
+
+async def render_async(
+    *filename, context: Optional[Mapping] = None, encoding: Optional[str] = None, templates_path: Optional[str] = None
+) -> Union[str, bytes]:
+    ''' Renders a template from ``templates_path`` (by default ``TEMPLATES_PATH``), as ``render`` does, without blocking the event loop on I/O '''
+    renderer = _Renderer(context=await _prepare(filename, context, templates_path), templates_path=templates_path)
+    renderer.render(*filename)
+    output = renderer.out.read()
+    return output if encoding is None else output.encode(encoding)
+
+
+async def iter_render_async(
+    *filename, chunk_size: int = 16 * 1024, encoding: str = 'utf-8', context: Optional[Mapping] = None,
+    templates_path: Optional[str] = None
+) -> AsyncIterator[bytes]:
+    ''' Renders a template as ``render_async`` does, yielding its output encoded, in chunks of around ``chunk_size`` characters
+
+    Closing the generator early stops the render.
+    '''
+    context = await _prepare(filename, context, templates_path)
+    loop = get_running_loop()
+    chunks = Queue(maxsize=2)
+    cancelled = Event()
+    done = object()
+
+    def put(item) -> None:
+        run_coroutine_threadsafe(chunks.put(item), loop).result()
+
+    def send(chunk: str) -> None:
+        if cancelled.is_set():
+            raise _RenderCancelled
+        put(chunk.encode(encoding))
+
+    def run() -> None:
+        try:
+            renderer = _Renderer(context=context, out=_ChunkedRenderStream(send, chunk_size), templates_path=templates_path)
+            renderer.render(*filename)
+            renderer.out.flush()
+        except _RenderCancelled:
+            return
+        except BaseException as e:
+            put(e)
+        put(done)
+
+    worker = Thread(target=run, daemon=True)
+    worker.start()
+    try:
+        while (chunk := await chunks.get()) is not done:
+            if isinstance(chunk, BaseException):
+                raise chunk
+            yield chunk
+    finally:
+        cancelled.set()
+        while worker.is_alive():
+            while not chunks.empty():
+                chunks.get_nowait()
+            await sleep(0.01)
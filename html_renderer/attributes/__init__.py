@@ -1,5 +1,6 @@
 from typing import NewType, Optional, Union
 from collections import deque
+import sys
 
 from ..selector import Selectable, selector
 
@@ -7,9 +8,11 @@ Attribute = NewType('Attribute', Selectable)
 class Attribute(Selectable):
     'Generic attribute, is the base class for all attributes'
 
-    type: str = None
+    __slots__ = ('value',)
+
+    type: str = 'attribute'
     ''' The type of attribute, used to produce the attribute string for tags
-    If left as ``None``, gets set to the class name, in lowercase
+    If not set by a subclass, gets set to its class name, in lowercase
     '''
 
     selector: Optional[str] = None
@@ -17,8 +20,11 @@ class Attribute(Selectable):
     Used if a subclass doesn't define a __selector__ method.
     '''
 
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        if not cls.__dict__.get('type'): cls.type = sys.intern(cls.__name__.lower())
+
     def __init__(self, value: Optional[str] = None) -> None:
-        if not self.type: self.type = self.__class__.__name__.lower()
         self.value: str = value or ''
 
     def __bool__(self) -> bool: return bool(self.value)
@@ -40,7 +46,7 @@ class Attribute(Selectable):
 
     def __selector__(self) -> str:
         if self.selector:
-            return self.selector.format(**self.__dict__)
+            return self.selector.format(type=self.type, value=self.value) if self.value else ''
         return NotImplemented
 
 
@@ -49,6 +55,8 @@ from .id import *
 
 Attributes = NewType('Attributes', Selectable)
 class Attributes(Selectable):
+    __slots__ = ('cls', 'id', '_iter')
+
     def __init__(self) -> None:
         self.cls = Class()
         self.id = Id()
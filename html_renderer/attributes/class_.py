@@ -9,6 +9,8 @@ class Class(Attribute):
     ``classes`` - default classes to start with
     '''
 
+    __slots__ = ()
+
     def __init__(self, classes: Union[str, Iterable[str], Class] = '') -> None:
         super().__init__()
         
@@ -1,4 +1,6 @@
 from . import Attribute
 
 
-class Id(Attribute): selector = '#{value}'
+class Id(Attribute):
+    __slots__ = ()
+    selector = '#{value}'
@@ -0,0 +1,201 @@
+''' Builds a whole site of templates in parallel
+
+Every page under the source tree is rendered in a pool of worker processes, and written
+atomically to the same relative path under the output directory. Templates under the
+``templates`` folder (where ``include`` and ``extends`` look) are partials, not pages.
+
+Each build records, in a manifest next to the output directory (``{dest}.manifest.json``,
+so it isn't deployed with the site), the content hashes of every page and of every template it pulled in. An incremental build only re-renders the pages
+whose own hash, or the hash of anything they transitively include or extend, has changed.
+
+Usage: ``python -m html_renderer.build [src] dest [--workers N] [--incremental] [--manifest PATH] [--quiet]``
+'''
+
+import json
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import sha256
+from itertools import repeat
+from os import chmod, makedirs, replace, umask, walk
+from os.path import abspath, dirname, exists, join, relpath, splitext
+from tempfile import NamedTemporaryFile
+from time import perf_counter
+from typing import Iterable, Mapping, NamedTuple, Optional
+
+from . import Dependencies, _Renderer, _RendererBase
+from .pool import _context
+from .utils import TEMPLATES_PATH
+
+PAGE_SUFFIXES = ('.html', '.htm', '.shtml')
+EXCLUDE = ('templates',)
+MANIFEST_SUFFIX = '.manifest.json'
+MANIFEST_VERSION = 1
+
+_UMASK = umask(0o022)
+umask(_UMASK)
+
+
+class PageResult(NamedTuple):
+    path: str
+    seconds: float
+    size: int
+    hashes: Optional[dict[str, str]] = None
+    ''' The content hash of the page and of each template it depends on, by path relative to ``src`` '''
+    includes: Optional[dict[str, list[str]]] = None
+    ''' The templates each of those pulled in directly '''
+
+
+def find_pages(src: str, suffixes: Iterable[str] = PAGE_SUFFIXES, exclude: Iterable[str] = EXCLUDE) -> list[str]:
+    ''' Lists the pages under ``src``, relative to it, skipping any folder named in ``exclude`` '''
+    suffixes, exclude = tuple(suffixes), set(exclude)
+    pages = []
+    for root, dirs, files in walk(src):
+        dirs[:] = sorted(d for d in dirs if d not in exclude)
+        pages.extend(relpath(join(root, f), src) for f in sorted(files) if splitext(f)[1] in suffixes)
+    return pages
+
+
+def file_hash(path: str) -> Optional[str]:
+    try:
+        with open(path, 'rb') as f:
+            return sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def dependencies_of(graph: Dependencies, path: str) -> set[str]:
+    ''' Returns ``path`` and everything it transitively includes, in a renderer's dependency graph '''
+    found, stack = set(), [path]
+    while stack:
+        path = stack.pop()
+        if path not in found:
+            found.add(path)
+            stack.extend(graph.get(path, ()))
+    return found
+
+
+def manifest_path(dest: str) -> str:
+    ''' Where the manifest for a build into ``dest`` goes by default: next to it, rather than in it '''
+    return abspath(dest) + MANIFEST_SUFFIX
+
+
+def load_manifest(path: str) -> dict:
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = None
+    if not isinstance(manifest, dict) or manifest.get('version') != MANIFEST_VERSION:
+        manifest = {'version': MANIFEST_VERSION, 'pages': {}}
+    return manifest
+
+
+def is_stale(src: str, dest: str, page: str, entry: Optional[dict], hashes: dict[str, Optional[str]]) -> bool:
+    ''' Whether ``page`` needs rendering again, given its manifest ``entry``
+
+    ``hashes`` memoises file hashes across pages, so shared templates are only read once.
+    '''
+    if not entry or not exists(join(dest, page)):
+        return True
+    for path, expected in entry['hashes'].items():
+        if path not in hashes:
+            hashes[path] = file_hash(join(src, path))
+        if hashes[path] != expected:
+            return True
+    return False
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    ''' Writes ``data`` to a temporary file next to ``path``, then moves it into place
+
+    The file gets the permissions a plain ``open`` would give it, rather than the temporary file's ``0600``.
+    '''
+    makedirs(dirname(path) or '.', exist_ok=True)
+    with NamedTemporaryFile('wb', dir=dirname(path) or '.', delete=False) as f:
+        f.write(data)
+    chmod(f.name, 0o666 & ~_UMASK)
+    replace(f.name, path)
+
+
+_renderer: Optional[_RendererBase] = None
+_base_context: Optional[Mapping] = None
+_src: Optional[str] = None
+
+
+def _init_worker(src: str, context: Optional[Mapping]) -> None:
+    global _renderer, _base_context, _src
+    _renderer = _Renderer(context=_context(context), templates_path=src)
+    _base_context = context
+    _src = src
+
+
+def _build_page(page: str, dest: str) -> PageResult:
+    start = perf_counter()
+    _renderer.prepare(context=_context(_base_context))
+    _renderer.render(page)
+    data = _renderer.out.read().encode()
+    write_atomic(join(dest, page), data)
+    seconds = perf_counter() - start
+
+    graph = _renderer.dependencies
+    paths = dependencies_of(graph, _renderer.path)
+    return PageResult(
+        page, seconds, len(data),
+        hashes={relpath(p, _src): file_hash(p) for p in paths},
+        includes={relpath(p, _src): sorted(relpath(i, _src) for i in graph[p]) for p in paths if graph.get(p)},
+    )
+
+
+def build(
+    dest: str,
+    src: str = TEMPLATES_PATH,
+    workers: Optional[int] = None,
+    context: Optional[Mapping] = None,
+    pages: Optional[Iterable[str]] = None,
+    incremental: bool = False,
+    manifest: Optional[str] = None,
+) -> list[PageResult]:
+    ''' Renders every page under ``src`` into ``dest``, using ``workers`` processes
+
+    ``pages`` restricts the build to the given pages (relative to ``src``), and ``incremental``
+    further to those which are out of date according to the manifest, kept at the path
+    ``manifest`` (by default ``manifest_path(dest)``).
+    Returns the time taken and bytes written for each page rendered, in the order they were listed.
+    '''
+    pages = find_pages(src) if pages is None else list(pages)
+    manifest_file = manifest or manifest_path(dest)
+    manifest = load_manifest(manifest_file)
+    if incremental:
+        hashes = {}
+        pages = [p for p in pages if is_stale(src, dest, p, manifest['pages'].get(p), hashes)]
+    if not pages:
+        return []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(src, context)) as executor:
+        results = list(executor.map(_build_page, pages, repeat(dest)))
+
+    for result in results:
+        manifest['pages'][result.path] = {'hashes': result.hashes, 'includes': result.includes}
+    write_atomic(manifest_file, json.dumps(manifest, indent=2, sort_keys=True).encode())
+    return results
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = ArgumentParser(prog='python -m html_renderer.build', description='Render every page of a site')
+    parser.add_argument('src', nargs='?', default=TEMPLATES_PATH, help='the templates tree to build')
+    parser.add_argument('dest', help='the directory to write the rendered pages to')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='the number of processes (default: one per core)')
+    parser.add_argument('-i', '--incremental', action='store_true', help='only render pages which have changed')
+    parser.add_argument('-m', '--manifest', help='where to keep the build manifest (default: next to dest)')
+    parser.add_argument('-q', '--quiet', action='store_true', help='only report the total')
+    args = parser.parse_args(argv)
+
+    start = perf_counter()
+    results = build(args.dest, src=args.src, workers=args.workers, incremental=args.incremental, manifest=args.manifest)
+    if not args.quiet:
+        for result in results:
+            print(f'{result.seconds * 1000:9.2f} ms {result.size:10d} B  {result.path}')
+    print(f'Built {len(results)} pages in {perf_counter() - start:.2f} s')
+
+
+if __name__ == '__main__':
+    main()
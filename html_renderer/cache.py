@@ -0,0 +1,346 @@
+''' Process-wide caches shared by every renderer '''
+
+import marshal
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from hashlib import sha256
+from os import listdir, makedirs, remove, replace, stat, utime, walk
+from os.path import join, splitext
+from threading import RLock
+from time import time
+from types import CodeType
+from typing import Any, Callable, Hashable, Iterable, NamedTuple, Optional
+
+from .utils import BYTECODE_CACHE_PATH
+
+
+class LRUCache:
+    ''' A thread-safe mapping which evicts its least recently used entries
+
+    Entries are evicted once the total ``sizeof`` of the values goes over ``max_size``,
+    so by default ``max_size`` is a number of entries.
+    '''
+
+    def __init__(self, max_size: int, sizeof: Callable[[Any], int] = lambda _: 1) -> None:
+        self.max_size = max_size
+        self.sizeof = sizeof
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self._lock = RLock()
+
+    def __len__(self) -> int: return len(self._data)
+    def __contains__(self, key: Hashable) -> bool: return key in self._data
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            try:
+                value, _ = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        size = self.sizeof(value)
+        with self._lock:
+            self.pop(key)
+            if size > self.max_size:
+                return
+            self._data[key] = value, size
+            self.size += size
+            while self.size > self.max_size:
+                _, (_, evicted) = self._data.popitem(last=False)
+                self.size -= evicted
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            try:
+                value, size = self._data.pop(key)
+            except KeyError:
+                return default
+            self.size -= size
+            return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+
+class SourceCache:
+    ''' Caches the text of template files, up to ``max_size`` characters in total
+
+    ``validate`` decides how a cached file is checked before it's reused:
+
+    * ``'mtime'`` - its modification time and size must not have changed
+    * ``'hash'`` - it's read again, and its content hash must not have changed
+    * ``None`` - it isn't, the file is assumed not to change while cached
+    '''
+
+    def __init__(self, max_size: int = 32 * 1024 * 1024, validate: Optional[str] = 'mtime') -> None:
+        if validate not in ('mtime', 'hash', None):
+            raise ValueError(f'Expected validate to be \'mtime\', \'hash\' or None (got {validate!r})')
+        self.validate = validate
+        self.entries = LRUCache(max_size, sizeof=lambda entry: len(entry[1]))
+
+    @staticmethod
+    def _stamp(path: str) -> tuple[int, int]:
+        st = stat(path)
+        return st.st_mtime_ns, st.st_size
+
+    def read(self, path: str) -> str:
+        entry = self.entries.get(path)
+        if entry is not None:
+            if self.validate is None:
+                return entry[1]
+            if self.validate == 'mtime' and entry[0] == self._stamp(path):
+                return entry[1]
+        stamp = self._stamp(path) if self.validate == 'mtime' else None
+        with open(path, 'rb') as f:
+            data = f.read()
+        if self.validate == 'hash':
+            stamp = sha256(data).digest()
+            if entry is not None and entry[0] == stamp:
+                return entry[1]
+        source = data.decode().replace('\r\n', '\n').replace('\r', '\n')
+        self.entries.put(path, (stamp, source))
+        return source
+
+    def preload(self, root: str, suffixes: Optional[Iterable[str]] = None) -> int:
+        ''' Reads every file under ``root`` (with one of ``suffixes``, if given) into the cache
+
+        Returns the number of files read.
+        '''
+        suffixes = tuple(suffixes) if suffixes is not None else None
+        count = 0
+        for directory, _, files in walk(root):
+            for f in sorted(files):
+                if suffixes is None or splitext(f)[1] in suffixes:
+                    self.read(join(directory, f))
+                    count += 1
+        return count
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+
+class TreeCache:
+    ''' Caches parsed template trees, by path and content hash
+
+    The cached trees are shared by everyone who gets them from the cache, so must not be
+    modified; ``Parser`` hands out clones of them, unless told not to copy.
+    '''
+
+    def __init__(self, max_size: int = 256) -> None:
+        self.entries = LRUCache(max_size)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _hash(source: str) -> bytes:
+        return sha256(source.encode()).digest()
+
+    def get(self, path: str, source: str) -> Any:
+        entry = self.entries.get(path)
+        if entry is not None and entry[0] == self._hash(source):
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def put(self, path: str, source: str, tree: Any) -> None:
+        self.entries.put(path, (self._hash(source), tree))
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.hits = self.misses = 0
+
+
+class Fragment(NamedTuple):
+    ''' A rendered fragment, and the template dependency edges its render recorded
+
+    Edges are ``(parent, child)`` paths, with ``None`` as the parent standing for the
+    template the ``<cache>`` tag was in, so they can be replayed into another template's graph.
+    ``context`` and ``blocks`` are the values the render ``<set>``, and the ``<block>``
+    contents it defined, by name, so they can be replayed too.
+    '''
+    text: str
+    dependencies: tuple[tuple[Optional[str], str], ...] = ()
+    context: tuple[tuple[str, str], ...] = ()
+    blocks: tuple[tuple[str, str], ...] = ()
+
+    def size(self) -> int:
+        return (
+            len(self.text.encode()) + sum(len(parent or '') + len(child) for parent, child in self.dependencies)
+            + sum(len(k) + len(str(v)) for k, v in self.context) + sum(len(k) + len(v) for k, v in self.blocks)
+        )
+
+
+class FragmentCache(ABC):
+    ''' Stores rendered fragments (for ``<cache>`` tags) by key, each for up to ``ttl`` seconds '''
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Fragment]: ...
+
+    @abstractmethod
+    def put(self, key: str, fragment: Fragment, ttl: Optional[float] = None) -> None: ...
+
+    @abstractmethod
+    def clear(self) -> None: ...
+
+    @staticmethod
+    def expires(ttl: Optional[float]) -> Optional[float]:
+        return None if ttl is None else time() + ttl
+
+    @staticmethod
+    def expired(expires: Optional[float]) -> bool:
+        return expires is not None and expires <= time()
+
+
+class MemoryFragmentCache(FragmentCache):
+    ''' Keeps fragments in memory, evicting the least recently used once they take up more than ``max_size`` bytes '''
+
+    def __init__(self, max_size: int = 8 * 1024 * 1024) -> None:
+        self.entries = LRUCache(max_size, sizeof=lambda entry: entry[1].size())
+
+    def get(self, key: str) -> Optional[Fragment]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if self.expired(entry[0]):
+            self.entries.pop(key)
+            return None
+        return entry[1]
+
+    def put(self, key: str, fragment: Fragment, ttl: Optional[float] = None) -> None:
+        self.entries.put(key, (self.expires(ttl), fragment))
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+
+class DiskFragmentCache(FragmentCache):
+    ''' Keeps fragments as files in ``path``, so they're shared between processes and survive restarts '''
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def _path(self, key: str) -> str:
+        return join(self.path, sha256(key.encode()).hexdigest() + '.frag')
+
+    def get(self, key: str) -> Optional[Fragment]:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                expires, *fields = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if self.expired(expires):
+            try:
+                remove(path)
+            except OSError:
+                pass
+            return None
+        return Fragment(*fields)
+
+    def put(self, key: str, fragment: Fragment, ttl: Optional[float] = None) -> None:
+        try:
+            from tempfile import NamedTemporaryFile  # slow to import, and only needed to write
+            makedirs(self.path, exist_ok=True)
+            with NamedTemporaryFile('wb', dir=self.path, delete=False) as f:
+                marshal.dump((self.expires(ttl), *fragment), f)
+            replace(f.name, self._path(key))
+        except (OSError, ValueError):
+            pass
+
+    def clear(self) -> None:
+        try:
+            files = listdir(self.path)
+        except OSError:
+            return
+        for f in files:
+            if f.endswith('.frag'):
+                remove(join(self.path, f))
+
+
+class BytecodeCache:
+    ''' Keeps compiled templates as marshalled code objects in ``path``, by cache key
+
+    Once there are more than ``max_files``, the least recently used are removed. With
+    ``path`` set to ``None`` (the default, unless ``$HTML_RENDERER_CACHE`` is set), nothing is
+    kept on disk. The files are loaded as code and run, so ``path`` should only be writable by you.
+    '''
+
+    def __init__(self, path: Optional[str] = BYTECODE_CACHE_PATH, max_files: int = 1024) -> None:
+        self.path = path
+        self.max_files = max_files
+
+    def _path(self, key: str) -> str:
+        return join(self.path, key + '.bin')
+
+    def get(self, key: str) -> Optional[CodeType]:
+        if not self.path:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                code = marshal.load(f)
+            utime(path)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        return code if isinstance(code, CodeType) else None
+
+    def put(self, key: str, code: CodeType) -> None:
+        if not self.path:
+            return
+        try:
+            from tempfile import NamedTemporaryFile  # slow to import, and only needed to write
+            makedirs(self.path, exist_ok=True)
+            with NamedTemporaryFile('wb', dir=self.path, delete=False) as f:
+                marshal.dump(code, f)
+            replace(f.name, self._path(key))
+            self.evict()
+        except OSError:
+            pass
+
+    def files(self) -> list[str]:
+        if not self.path:
+            return []
+        try:
+            return [join(self.path, f) for f in listdir(self.path) if f.endswith('.bin')]
+        except OSError:
+            return []
+
+    def evict(self) -> None:
+        ''' Removes the least recently used files, until there are no more than ``max_files`` '''
+        files = self.files()
+        if len(files) <= self.max_files:
+            return
+        used = {}
+        for path in files:
+            try:
+                used[path] = stat(path).st_mtime_ns
+            except OSError:
+                pass
+        for path in sorted(used, key=used.get)[:len(used) - self.max_files]:
+            try:
+                remove(path)
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        for path in self.files():
+            try:
+                remove(path)
+            except OSError:
+                pass
+
+
+source_cache = SourceCache()
+tree_cache = TreeCache()
+fragment_cache = MemoryFragmentCache()
+bytecode_cache = BytecodeCache()
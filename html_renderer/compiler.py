@@ -0,0 +1,230 @@
+''' Compiles templates into Python render functions
+
+A template is parsed once, and turned into a function that writes the static markup as
+constant strings, and only calls back into the renderer for tags with handlers, and for
+text or attributes containing placeholders. Compiled functions are cached in memory, and
+(if it has a directory) as marshalled code objects in the renderer's ``bytecode`` cache, keyed by a hash of the
+template and of the code of the renderer's methods, since the markup they build (and the
+output of static handlers) is baked into the compiled function.
+'''
+
+import marshal
+import sys
+from functools import lru_cache
+from hashlib import sha256
+from html.parser import HTMLParser
+from typing import Callable, Iterable, Optional
+
+from .cache import LRUCache
+
+COMPILER_VERSION = 9
+
+_compiled = LRUCache(256)
+
+
+def _out(r, s):
+    if s is not None:
+        r.out.write(s)
+
+
+def is_static(s: Optional[str]) -> bool:
+    ''' Whether ``populate`` would leave ``s`` unchanged (no placeholders or charrefs) '''
+    return s is None or not ('{{' in s or '{&' in s or '&' in s)
+
+
+def is_static_handler(handler) -> bool:
+    ''' Whether every part of ``handler`` is marked with ``_TagRenderer._static`` '''
+    return all(getattr(h, 'static', False) for h in (handler if isinstance(handler, tuple) else (handler,)))
+
+
+class _Compiler(HTMLParser):
+    def __init__(self, renderer: type) -> None:
+        super().__init__(convert_charrefs=False)
+        self.renderer = renderer
+        self.static = renderer.__new__(renderer)
+        self.static.populate = lambda data: data
+        self.lines = []
+        self.pending = []
+        self.captures = []
+        self.guards = []
+
+    def handler(self, tagname: str, table: str):
+        ''' Returns the dispatch table entry for ``tagname``, and the handler it was built from (for its markers) '''
+        func = getattr(self.renderer, table).get(tagname)
+        if func is None:
+            return None, None
+        suffix = {'starts': '_start', 'ends': '_end', 'startends': ''}[table]
+        return func, getattr(self.renderer, '_handle_' + tagname.replace('-', '_') + suffix)
+
+    def emit(self, line: str):
+        self.flush()
+        self.lines.append('    ' * len(self.guards) + line)
+
+    def flush(self):
+        if self.pending:
+            self.lines.append('    ' * len(self.guards) + 'r.out.write(' + repr('\n'.join(self.pending)) + ')')
+            self.pending = []
+
+    def hoist(self, handler, call: Callable) -> bool:
+        ''' Runs a static handler now, adding its output to the constant markup
+
+        Returns whether it could; if it raises, it's left to raise at render time instead.
+        '''
+        if not is_static_handler(handler):
+            return False
+        try:
+            out = call(self.static)
+        except Exception:
+            return False
+        if out is not None:
+            self.pending.append(out)
+        return True
+
+    def handle_startendtag(self, tagname: str, attrs: list[tuple[str, Optional[str]]]) -> None:
+        attrs = dict(attrs)
+        static = all(is_static(k) and is_static(v) for k, v in attrs.items())
+        func, handler = self.handler(tagname, 'startends')
+        if func is None:
+            if static:
+                return self.pending.append(self.static.make_tag_startend(tagname, attrs))
+            return self.emit(f'_out(r, r.make_tag_startend({tagname!r}, {attrs!r}))')
+        if static and self.hoist(handler, lambda r: func(r, dict(attrs))):
+            return
+        self.emit(f'_out(r, r.startends[{tagname!r}](r, {attrs!r}))')
+
+    def handle_starttag(self, tagname: str, attrs: list[tuple[str, Optional[str]]]) -> None:
+        attrs = dict(attrs)
+        static = all(is_static(k) and is_static(v) for k, v in attrs.items())
+        func, handler = self.handler(tagname, 'starts')
+        if func is None:
+            if static:
+                return self.pending.append(self.static.make_tag_start(tagname, attrs))
+            return self.emit(f'_out(r, r.make_tag_start({tagname!r}, {attrs!r}))')
+        handlers = handler if isinstance(handler, tuple) else (handler,)
+        if any(getattr(h, 'captures_data', False) for h in handlers):
+            self.captures.append(tagname)
+        if getattr(handler, 'guards_body', False):
+            self.emit(f'if r.starts[{tagname!r}](r, {attrs!r}):')
+            return self.guards.append(tagname)
+        if static and self.hoist(handler, lambda r: func(r, dict(attrs))):
+            return
+        self.emit(f'_out(r, r.starts[{tagname!r}](r, {attrs!r}))')
+
+    def handle_endtag(self, tagname: str) -> None:
+        if self.captures and self.captures[-1] == tagname:
+            self.captures.pop()
+        if self.guards and self.guards[-1] == tagname:
+            self.flush()
+            if self.lines[-1].endswith(':'): self.emit('pass')
+            self.guards.pop()
+        func, handler = self.handler(tagname, 'ends')
+        if func is None:
+            return self.pending.append(self.static.make_tag_end(tagname))
+        if self.hoist(handler, func):
+            return
+        self.emit(f'_out(r, r.ends[{tagname!r}](r))')
+
+    def handle_decl(self, decl: str) -> None:
+        self.pending.append(f'<!{decl}>')
+
+    def handle_data(self, data: str) -> None:
+        if self.captures or not is_static(data):
+            return self.emit(f'r.handle_data({data!r})')
+        self.pending.append(data)
+
+    def handle_entityref(self, name: str) -> None:
+        self.emit(f'r.handle_entityref({name!r})')
+
+    def handle_charref(self, name: str) -> None:
+        if self.captures:
+            return self.emit(f'r.handle_charref({name!r})')
+        self.pending.append(f'&#{name};')
+
+    def compile(self, source: str, filename: str):
+        self.feed(source)
+        self.close()
+        self.flush()
+        if self.guards and self.lines[-1].endswith(':'): self.emit('pass')
+        body = '\n'.join('    ' + line for line in self.lines) or '    pass'
+        return compile(f'def render(r):\n{body}\n', filename, 'exec')
+
+
+def code_hash(objects: Iterable) -> str:
+    ''' Hashes the code of functions, with the functions and values their closures and defaults hold '''
+    digest = sha256()
+    stack, seen = list(objects)[::-1], set()
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, (staticmethod, classmethod)):
+            obj = obj.__func__
+        if isinstance(obj, (tuple, list)):
+            stack.extend(reversed(obj))
+            continue
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        code = getattr(obj, '__code__', None)
+        if code is not None:
+            digest.update(marshal.dumps(code))
+            cells = []
+            for cell in getattr(obj, '__closure__', None) or ():
+                try:
+                    cells.append(cell.cell_contents)
+                except ValueError:
+                    pass
+            stack.extend(reversed((*(getattr(obj, '__defaults__', None) or ()), *cells)))
+        elif isinstance(obj, type):
+            digest.update(f'{obj.__module__}.{obj.__qualname__}'.encode())
+        elif obj is None or isinstance(obj, (str, int, float)):
+            digest.update(repr(obj).encode())
+        else:
+            digest.update(type(obj).__qualname__.encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def _signature(renderer: type) -> str:
+    handlers = sorted(
+        name + ('*' if any(getattr(h, 'captures_data', False) for h in (v if isinstance(v, tuple) else (v,))) else '')
+        + ('?' if getattr(v, 'guards_body', False) else '') + ('!' if is_static_handler(v) else '')
+        for name in dir(renderer) if name.startswith('_handle_') and (v := getattr(renderer, name)) is not None
+    )
+    code = code_hash(
+        v for c in renderer.__mro__ if c not in HTMLParser.__mro__ for v in vars(c).values()
+        if callable(v) or isinstance(v, (tuple, staticmethod, classmethod))
+    )
+    return f'{renderer.__module__}.{renderer.__qualname__} {code} ' + ' '.join(handlers)
+
+
+def cache_key(source: str, renderer: type) -> str:
+    ''' Hashes the template source together with everything its compiled form depends on '''
+    key = sha256()
+    for part in (str(COMPILER_VERSION), sys.implementation.cache_tag or '', _signature(renderer), source):
+        key.update(part.encode())
+        key.update(b'\0')
+    return key.hexdigest()
+
+
+def compile_template(source: str, renderer: type) -> Callable:
+    ''' Returns the render function for ``source``, compiling it if it isn't cached
+
+    The function takes a single argument, the ``renderer`` instance to render with.
+    '''
+    key = cache_key(source, renderer)
+    func = _compiled.get(key)
+    if func is None:
+        code = renderer.bytecode.get(key)
+        if code is None:
+            code = _Compiler(renderer).compile(source, f'<template {key[:12]}>')
+            renderer.bytecode.put(key, code)
+        namespace = {'_out': _out}
+        exec(code, namespace)
+        func = namespace['render']
+        _compiled.put(key, func)
+    return func
+
+
+def clear_cache() -> None:
+    _compiled.clear()
+    _signature.cache_clear()
@@ -0,0 +1,127 @@
+from collections.abc import MutableMapping
+from re import compile as re_compile, escape as re_escape
+from typing import Iterator, Mapping
+
+
+class ContextItem:
+    ''' A context value, with the placeholder pattern for its key
+
+    The pattern and the escaped value are only built the first time they're used.
+    '''
+
+    __slots__ = ('raw_k', 'raw_v', '_search', '_value')
+
+    def __init__(self, k='', v=''):
+        self.raw_k = k
+        self.raw_v = v
+        self._search = None
+        self._value = None
+
+    @property
+    def search(self):
+        if self._search is None:
+            self._search = re_compile(f'\\{{\\{{ *{self.raw_k} *\\}}\\}}')
+        return self._search
+
+    @property
+    def k(self):
+        return self.search
+
+    @k.setter
+    def k(self, k):
+        self.raw_k = k
+        self._search = None
+
+    @property
+    def value(self):
+        if self._value is None:
+            self._value = re_escape(self.raw_v)
+        return self._value
+
+    @property
+    def v(self):
+        return self.value
+
+    @v.setter
+    def v(self, v):
+        self.raw_v = v
+        self._value = None
+
+
+def decode(k: str, v) -> ContextItem:
+    ''' Turns a caller's context value into a ``ContextItem``, decoding ``%20`` and ``%27`` '''
+    if isinstance(v, ContextItem): v = v.raw_v
+    return ContextItem(k, v.replace('%20', ' ').replace('%27', '\''))
+
+
+class Context(MutableMapping):
+    ''' A layered, copy-on-write context, like a ``ChainMap`` of ``ContextItem``
+
+    Lookups go through ``maps`` in order, and writes only go to the first, so the mappings
+    under it (the caller's context, or the defaults) are never changed. Values from those are
+    decoded into ``ContextItem`` the first time they're looked up. ``version`` counts the
+    changes made, so anything cached from the context can tell when it's stale.
+    '''
+
+    __slots__ = ('maps', 'version')
+
+    def __init__(self, *maps: Mapping) -> None:
+        self.maps: list[Mapping] = [{}, *maps]
+        self.version = 0
+
+    def __getitem__(self, key: str) -> ContextItem:
+        local = self.maps[0]
+        try:
+            return local[key]
+        except KeyError:
+            pass
+        for mapping in self.maps[1:]:
+            if key in mapping:
+                item = local[key] = decode(key, mapping[key])
+                return item
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value) -> None:
+        self.maps[0][key] = value if isinstance(value, ContextItem) else ContextItem(key, value)
+        self.version += 1
+
+    def __delitem__(self, key: str) -> None:
+        del self.maps[0][key]
+        self.version += 1
+
+    def __contains__(self, key) -> bool:
+        return any(key in mapping for mapping in self.maps)
+
+    def __iter__(self) -> Iterator[str]:
+        keys = {}
+        for mapping in reversed(self.maps):
+            keys.update(dict.fromkeys(mapping))
+        return iter(keys)
+
+    def __len__(self) -> int:
+        return len(set().union(*self.maps))
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__qualname__}({", ".join(map(repr, self.maps))})'
+
+    def new_child(self) -> 'Context':
+        ''' Returns a context layered over this one, which writes to its own first mapping '''
+        return self.__class__(*self.maps)
+
+
+class _RecordingContext(Context):
+    ''' A view of a context, which writes to the same mappings and remembers what was set through it, in ``sets`` '''
+
+    __slots__ = ('sets',)
+
+    def __init__(self, context: Context) -> None:
+        self.maps = context.maps
+        self.version = context.version
+        self.sets: dict[str, ContextItem] = {}
+
+    def __setitem__(self, key: str, value) -> None:
+        super().__setitem__(key, value)
+        self.sets[key] = self.maps[0][key]
+
+    def new_child(self) -> Context:
+        return Context(*self.maps)
@@ -1,3 +1,5 @@
 
 class Environment:
-    pass
+    @staticmethod
+    def items():
+        return ()
@@ -0,0 +1,84 @@
+''' Mail merge: rendering one template with many contexts
+
+The template is read and compiled once, and a single renderer is reset with ``prepare`` for
+each context, so each render only runs the template's dynamic parts against the new values.
+Results are yielded in order as they're rendered, and contexts are only taken from the
+iterable as they're needed, so neither has to fit in memory at once.
+'''
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from os.path import join
+from typing import Callable, Iterable, Iterator, Mapping, Optional
+
+from . import _Renderer, _RendererBase
+from .compiler import compile_template
+from .pool import _context
+
+
+class Merge:
+    ''' A template, compiled once, and a renderer to render it with any number of contexts
+
+    ``source``, if given, is rendered instead of reading the template from ``filename``
+    (which is still used as the template's path, for its dependencies).
+    '''
+
+    def __init__(
+        self, *filename, source: Optional[str] = None, renderer: type = _Renderer,
+        templates_path: Optional[str] = None
+    ) -> None:
+        self.renderer: _RendererBase = renderer(templates_path=templates_path)
+        self.path = join(self.renderer.templates_path, *filename) if filename else None
+        if source is None:
+            source = self.renderer.sources.read(self.path)
+        self.template: Callable = compile_template(source, renderer)
+
+    def render(self, context: Optional[Mapping] = None) -> str:
+        renderer = self.renderer
+        renderer.prepare(context=_context(context))
+        renderer.path = self.path
+        self.template(renderer)
+        return renderer.out.read()
+
+    def render_all(self, contexts: Iterable[Optional[Mapping]]) -> Iterator[str]:
+        return map(self.render, contexts)
+
+
+_merge: Optional[Merge] = None
+
+
+def _init_worker(filename: tuple[str, ...], source: Optional[str], renderer: type, templates_path: Optional[str]) -> None:
+    global _merge
+    _merge = Merge(*filename, source=source, renderer=renderer, templates_path=templates_path)
+
+
+def _render_batch(contexts: list[Optional[Mapping]]) -> list[str]:
+    return [_merge.render(context) for context in contexts]
+
+
+def render_batch(
+    *filename, contexts: Iterable[Optional[Mapping]], source: Optional[str] = None,
+    renderer: type = _Renderer, templates_path: Optional[str] = None,
+    processes: Optional[int] = None, batch_size: int = 256,
+) -> Iterator[str]:
+    ''' Renders a template once for each of ``contexts``, yielding the outputs in order
+
+    With ``processes`` set, contexts are sent ``batch_size`` at a time to that many worker
+    processes, each with its own compiled copy of the template. Contexts and the renderer
+    class must then be picklable. At most two batches per process are in flight at once.
+    '''
+    if not processes:
+        yield from Merge(*filename, source=source, renderer=renderer, templates_path=templates_path).render_all(contexts)
+        return
+    contexts = iter(contexts)
+    with ProcessPoolExecutor(
+        max_workers=processes, initializer=_init_worker, initargs=(filename, source, renderer, templates_path)
+    ) as executor:
+        pending = deque()
+        while True:
+            while len(pending) < 2 * processes and (batch := list(islice(contexts, batch_size))):
+                pending.append(executor.submit(_render_batch, batch))
+            if not pending:
+                return
+            yield from pending.popleft().result()
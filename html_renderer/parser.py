@@ -1,43 +1,135 @@
 from collections import deque
 from html.parser import HTMLParser
 from os.path import join
-from typing import Optional, Union
+from typing import Iterator, Optional, Union
 
 from .tag import Tag, Text
 from .tags.default.block import Div
 
 from . import TEMPLATES_PATH
+from .cache import TreeCache, source_cache, tree_cache
 from .tags import get_tag
 
 
 class Parser(HTMLParser):
-    def __init__(self) -> None:
+    ''' Parses templates into trees of ``Tag`` and ``Text``
+
+    Trees parsed from files are cached in ``trees``, and each parse gets its own clone of the
+    cached tree. With ``copy`` unset, the cached tree itself is handed out, which saves the
+    copy but is shared with every other such parse, so must not be modified.
+    '''
+
+    trees: TreeCache = tree_cache
+
+    def __init__(self, copy: bool = True) -> None:
         super().__init__()
+        self.copy = copy
         self.tag_stack: deque[Tag] = deque()
         self.result: Union[Tag, None] = None
 
+    @staticmethod
+    def make_tag(tag_name: str, attrs: list[tuple[str, Optional[str]]]) -> Tag:
+        return get_tag(tag_name, default=Div)(attrs=dict(attrs, tagtype=tag_name))
+
+    def attach(self, node: Union[Tag, Text]) -> None:
+        if self.tag_stack:
+            self.tag_stack[-1].add_child(node)
+        elif isinstance(node, Tag): self.result = node
+
     def handle_starttag(self, tag_name: str, attrs: list[tuple[str, Optional[str]]]) -> None:
-        tag = get_tag(tag_name, default=Div)(attrs=dict(attrs, tagtype=tag_name))
-        self.tag_stack.append(tag)
+        self.tag_stack.append(self.make_tag(tag_name, attrs))
 
     def handle_endtag(self, tag_name: str) -> None:
-        tag = self.tag_stack.pop()
-        if self.tag_stack:
-            self.tag_stack[-1].add_child(tag)
-        else: self.result = tag
+        self.attach(self.tag_stack.pop())
 
     def handle_startendtag(self, tag_name: str, attrs: list[tuple[str, Optional[str]]]) -> None:
-        tag = get_tag(tag_name, Div)(attrs=dict(attrs, tagtype=tag_name))
-        if self.tag_stack:
-            self.tag_stack[-1].add_child(tag)
-        self.result = tag
+        self.attach(self.make_tag(tag_name, attrs))
 
     def handle_data(self, data: str) -> None:
         if self.tag_stack and data.strip():
-            self.tag_stack[-1].add_child(Text(content=data))
+            self.attach(Text(content=data))
 
     def parse(self, *filename):
-        with open(join(TEMPLATES_PATH, *filename), 'r') as f:
-            data = f.read()
-        self.parse_text(data)
+        path = join(TEMPLATES_PATH, *filename)
+        data = source_cache.read(path)
+        tree = self.trees.get(path, data)
+        if tree is None:
+            self.parse_text(data)
+            tree = self.result
+            if tree is None:
+                return
+            self.trees.put(path, data, tree)
+        self.result = tree.copy() if self.copy else tree
     parse_text = HTMLParser.feed
+
+
+Event = tuple[str, Union[Tag, Text]]
+
+
+class EventParser(Parser):
+    ''' Parses templates into a stream of ``('start', tag)``, ``('end', tag)`` and ``('text', text)`` events
+
+    Events are buffered in ``events`` as the text is fed in. With ``prune`` set, tags and text
+    aren't added to their parents once their events have been produced, so only the open tags
+    are kept in memory, and every tag is childless when its ``'end'`` event is seen.
+    '''
+
+    def __init__(self, prune: bool = False) -> None:
+        super().__init__()
+        self.prune = prune
+        self.events: deque[Event] = deque()
+        self._text: list[str] = []
+
+    def attach(self, node: Union[Tag, Text]) -> None:
+        if not self.prune or not self.tag_stack:
+            super().attach(node)
+
+    def flush_text(self) -> None:
+        ''' Produces the text seen since the last tag, which may have been fed in several chunks '''
+        data = ''.join(self._text)
+        self._text.clear()
+        if self.tag_stack and data.strip():
+            text = Text(content=data)
+            self.attach(text)
+            self.events.append(('text', text))
+
+    def handle_starttag(self, tag_name: str, attrs: list[tuple[str, Optional[str]]]) -> None:
+        if self._text: self.flush_text()
+        super().handle_starttag(tag_name, attrs)
+        self.events.append(('start', self.tag_stack[-1]))
+
+    def handle_endtag(self, tag_name: str) -> None:
+        if self._text: self.flush_text()
+        if not self.tag_stack: return
+        tag = self.tag_stack[-1]
+        super().handle_endtag(tag_name)
+        self.events.append(('end', tag))
+
+    def handle_startendtag(self, tag_name: str, attrs: list[tuple[str, Optional[str]]]) -> None:
+        if self._text: self.flush_text()
+        tag = self.make_tag(tag_name, attrs)
+        self.events.append(('start', tag))
+        self.attach(tag)
+        self.events.append(('end', tag))
+
+    def handle_data(self, data: str) -> None:
+        self._text.append(data)
+
+    def close(self) -> None:
+        super().close()
+        if self._text: self.flush_text()
+
+def iterparse(*filename: str, chunk_size: int = 64 * 1024, prune: bool = False) -> Iterator[Event]:
+    ''' Parses a template a ``chunk_size`` characters at a time, yielding its events as they're found
+
+    Unlike ``Parser.parse`` the file is never read whole, or cached, so with ``prune`` set
+    memory use doesn't grow with its size. See ``EventParser`` for the events.
+    '''
+    parser = EventParser(prune=prune)
+    events = parser.events
+    with open(join(TEMPLATES_PATH, *filename), newline=None) as f:
+        while chunk := f.read(chunk_size):
+            parser.feed(chunk)
+            while events: yield events.popleft()
+    parser.close()
+    while events: yield events.popleft()
@@ -0,0 +1,78 @@
+''' Concurrent rendering
+
+A renderer holds the state of one render at a time: its context, blocks, output stream
+and tag stacks all live on the instance, and nothing is shared through module globals
+(the compiled template and matcher caches are only ever added to, and hold no per-render
+state). So any number of renderers can run at once, in as many threads, as long as each
+is used by one thread at a time.
+
+A ``RendererPool`` hands out idle renderers, resetting them with ``prepare`` rather than
+building a new parser for each render, and takes them back afterwards. ``render_many``
+renders a list of templates across a thread pool using one.
+'''
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from queue import Empty, Full, Queue
+from typing import Iterable, Iterator, Mapping, Optional, Union
+
+from . import Context, _Renderer, _RendererBase
+
+_path = Union[str, Iterable[str]]
+
+
+def _context(context: Optional[Mapping]) -> Optional[Context]:
+    ''' Layers a new context over a caller's, so renders never share (or mutate) one '''
+    return None if context is None else Context(context)
+
+
+class RendererPool:
+    ''' A thread-safe pool of reusable renderers
+
+    ``size`` caps how many idle renderers are kept, not how many can be in use at once.
+    '''
+
+    def __init__(self, renderer: type = _Renderer, size: Optional[int] = None) -> None:
+        self.renderer = renderer
+        self.idle: Queue[_RendererBase] = Queue(maxsize=size or 0)
+
+    @contextmanager
+    def acquire(self, context: Optional[Mapping] = None) -> Iterator[_RendererBase]:
+        try:
+            renderer = self.idle.get_nowait()
+        except Empty:
+            renderer = self.renderer(context=_context(context))
+        else:
+            renderer.prepare(context=_context(context))
+        try:
+            yield renderer
+        finally:
+            try:
+                self.idle.put_nowait(renderer)
+            except Full:
+                pass
+
+    def render(self, *filename, context: Optional[Mapping] = None) -> str:
+        with self.acquire(context) as renderer:
+            renderer.render(*filename)
+            return renderer.out.read()
+
+
+def render_many(
+    paths: Iterable[_path],
+    contexts: Optional[Iterable[Optional[Mapping]]] = None,
+    workers: Optional[int] = None,
+    pool: Optional[RendererPool] = None,
+) -> list[str]:
+    ''' Renders each of ``paths`` with the matching one of ``contexts``, using ``workers`` threads
+
+    Each path is a filename or a sequence of path parts under ``TEMPLATES_PATH``.
+    Returns the outputs in the same order as ``paths``.
+    '''
+    paths = [(p,) if isinstance(p, str) else tuple(p) for p in paths]
+    contexts = [None] * len(paths) if contexts is None else list(contexts)
+    if len(contexts) != len(paths):
+        raise ValueError(f'Expected {len(paths)} contexts (got {len(contexts)})')
+    pool = pool or RendererPool()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda path, context: pool.render(*path, context=context), paths, contexts))
@@ -0,0 +1,140 @@
+''' Opt-in render profiling
+
+``Profile.instrument`` returns a subclass of a renderer whose handlers, ``populate`` and
+``render`` record into the profile; includes create renderers of the same class, so they're
+recorded too, with their renders nested in the span of the render that included them.
+Nothing is recorded, or wrapped, outside renderers created from that subclass.
+
+Handlers the compiler hoists (static handlers with constant attrs) run once at compile
+time rather than on each render, so they only show up in the first profiled render of a
+template, if at all.
+'''
+
+import json
+from collections import defaultdict
+from time import perf_counter
+from types import MappingProxyType
+from typing import Any, Callable, Mapping, Optional
+
+from . import _Renderer
+
+
+class Stat:
+    __slots__ = ('count', 'seconds', 'bytes')
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.seconds = 0.0
+        self.bytes = 0
+
+    def as_dict(self) -> dict:
+        return {'count': self.count, 'seconds': self.seconds, 'bytes': self.bytes}
+
+
+class Profile:
+    ''' Call counts, cumulative time and output size per handler, render and ``populate``
+
+    ``stats`` is keyed by ``(kind, name)``: ``('handler', '{tag}[_start|_end]')``,
+    ``('render', path)`` or ``('populate', 'populate')``. ``spans`` holds a tree of renders,
+    and ``stacks`` the time spent in each call stack itself (less its callees).
+    A profile records one render at a time.
+    '''
+
+    def __init__(self) -> None:
+        self.stats: defaultdict[tuple[str, str], Stat] = defaultdict(Stat)
+        self.stacks: defaultdict[str, float] = defaultdict(float)
+        self.spans: list[dict] = []
+        self._frames: list[list] = []
+        self._spans: list[dict] = []
+        self._start = perf_counter()
+
+    def call(self, kind: str, name: str, func: Callable, *args) -> Any:
+        ''' Calls ``func``, recording it under ``kind`` and ``name`` '''
+        frame = [f'{kind}:{name}'.replace(' ', '_').replace(';', '_'), 0.0]
+        self._frames.append(frame)
+        span = None
+        if kind == 'render':
+            span = {'name': name, 'start': perf_counter() - self._start, 'seconds': 0.0, 'children': []}
+            (self._spans[-1]['children'] if self._spans else self.spans).append(span)
+            self._spans.append(span)
+        result = None
+        start = perf_counter()
+        try:
+            result = func(*args)
+            return result
+        finally:
+            seconds = perf_counter() - start
+            self.stacks[';'.join(f[0] for f in self._frames)] += seconds - frame[1]
+            self._frames.pop()
+            if self._frames:
+                self._frames[-1][1] += seconds
+            if span is not None:
+                span['seconds'] = seconds
+                self._spans.pop()
+            stat = self.stats[kind, name]
+            stat.count += 1
+            stat.seconds += seconds
+            if isinstance(result, str):
+                stat.bytes += len(result.encode())
+
+    def _wrap(self, table: Mapping[str, Callable], suffix: str) -> MappingProxyType:
+        ''' Wraps each handler in ``table`` to record its calls
+
+        The ``guards_body`` marker is kept, since it changes what the renderer does with the result,
+        but not ``static``, so the compiler still calls static handlers on every render to time them.
+        '''
+        call = self.call
+        wrapped = {}
+        for tag, func in table.items():
+            name = tag.replace('-', '_') + suffix
+            handler = wrapped[tag] = lambda *args, func=func, name=name: call('handler', name, func, *args)
+            handler.guards_body = getattr(func, 'guards_body', False)
+        return MappingProxyType(wrapped)
+
+    def instrument(self, renderer: type = _Renderer) -> type:
+        ''' Returns a subclass of ``renderer`` which records into this profile '''
+        call = self.call
+
+        class Profiled(renderer):
+            def populate(self, data):
+                return call('populate', 'populate', renderer.populate, self, data)
+
+            def render(self, *filename) -> None:
+                return call('render', '/'.join(filename), renderer.render, self, *filename)
+
+        Profiled.__name__ = Profiled.__qualname__ = 'Profiled' + renderer.__name__
+        Profiled.starts = self._wrap(Profiled.starts, '_start')
+        Profiled.ends = self._wrap(Profiled.ends, '_end')
+        Profiled.startends = self._wrap(Profiled.startends, '')
+        return Profiled
+
+    def render(self, *filename, context=None, renderer: type = _Renderer, **kwargs) -> str:
+        ''' Renders a template with an instrumented ``renderer``, returning the output '''
+        r = self.instrument(renderer)(context=context, **kwargs)
+        r.render(*filename)
+        return r.out.read()
+
+    def as_dict(self) -> dict:
+        grouped = defaultdict(dict)
+        for (kind, name), stat in sorted(self.stats.items()):
+            grouped[kind][name] = stat.as_dict()
+        return {'stats': dict(grouped), 'spans': self.spans}
+
+    def dump_json(self, path: Optional[str] = None) -> str:
+        ''' Returns the profile as JSON, also writing it to ``path`` if given '''
+        data = json.dumps(self.as_dict(), indent=2)
+        if path:
+            with open(path, 'w') as f:
+                f.write(data)
+        return data
+
+    def dump_collapsed(self, path: Optional[str] = None) -> str:
+        ''' Returns the profile as collapsed stacks (in microseconds), as flamegraph tools read them
+
+        Also writes it to ``path``, if given.
+        '''
+        data = ''.join(f'{stack} {round(seconds * 1e6)}\n' for stack, seconds in sorted(self.stacks.items()))
+        if path:
+            with open(path, 'w') as f:
+                f.write(data)
+        return data
@@ -1,12 +1,239 @@
-from typing import Union
+from collections import defaultdict
+from functools import lru_cache
+from re import VERBOSE, compile as re_compile
+from typing import Iterable, Optional, Union
+
+from .tag import Tag, iter_preorder
 
 NotImplementedType = type(NotImplemented)
 
 
 class Selectable:
+    __slots__ = ()
+
     def __selector__(self) -> Union[str, NotImplementedType]:
         return NotImplemented
 
 
 def selector(x: Selectable):
     return x.__selector__()
+
+
+def tag_type(tag: Tag) -> str:
+    ''' The name a tag was written with, which selectors match against '''
+    return (tag.attrs.get('tagtype') or tag.type).lower()
+
+
+class TreeIndex:
+    ''' Indexes every tag in a tree by id, class and type, and records where it sits in the tree
+
+    Building it marks every tag in the tree unchanged, so the indexes of any subtrees are
+    dropped, as they could no longer tell whether they're stale.
+    '''
+
+    def __init__(self, root: Tag) -> None:
+        self.tags: list[Tag] = []
+        self.order: dict[Tag, int] = {}
+        self.parents: dict[Tag, Tag] = {}
+        self.positions: dict[Tag, int] = {}
+        self.by_id: defaultdict[str, list[Tag]] = defaultdict(list)
+        self.by_class: defaultdict[str, list[Tag]] = defaultdict(list)
+        self.by_type: defaultdict[str, list[Tag]] = defaultdict(list)
+        for tag in iter_preorder(root):
+            if not isinstance(tag, Tag): continue
+            tag._dirty = False
+            if tag is not root: tag._index = None
+            self.order[tag] = len(self.tags)
+            self.tags.append(tag)
+            for i, child in enumerate(tag.children):
+                self.parents[child] = tag
+                self.positions[child] = i
+            if tag.attrs.get('id'): self.by_id[tag.attrs['id']].append(tag)
+            for cls in set(tag.attrs.get('class') or ()):
+                if cls: self.by_class[cls].append(tag)
+            self.by_type[tag_type(tag)].append(tag)
+
+    @classmethod
+    def of(cls, root: Tag) -> 'TreeIndex':
+        ''' Returns the index for the tree under ``root``, building it again if the tree has changed since '''
+        if root._index is None or root._dirty:
+            root._index = cls(root)
+        return root._index
+
+    def previous_siblings(self, tag: Tag) -> Iterable[Tag]:
+        parent = self.parents.get(tag)
+        if parent is None: return
+        children = parent.children
+        for i in range(self.positions[tag] - 1, -1, -1):
+            if isinstance(children[i], Tag): yield children[i]
+
+
+_ATTR_OPS = {
+    '=': lambda actual, value: actual == value,
+    '~=': lambda actual, value: value in actual.split(),
+    '^=': lambda actual, value: bool(value) and actual.startswith(value),
+    '$=': lambda actual, value: bool(value) and actual.endswith(value),
+    '*=': lambda actual, value: bool(value) and value in actual,
+    '|=': lambda actual, value: actual == value or actual.startswith(value + '-'),
+}
+
+
+class Compound:
+    ''' Matches a single tag against a type, id, classes and attributes '''
+
+    def __init__(self) -> None:
+        self.type: Optional[str] = None
+        self.id: Optional[str] = None
+        self.classes: list[str] = []
+        self.attrs: list[tuple[str, Optional[str], Optional[str]]] = []
+
+    def __bool__(self) -> bool:
+        return bool(self.type or self.id or self.classes or self.attrs)
+
+    def matches(self, tag: Tag) -> bool:
+        attrs = tag.attrs
+        if self.type and self.type != '*' and tag_type(tag) != self.type: return False
+        if self.id and attrs.get('id') != self.id: return False
+        if self.classes:
+            classes = attrs.get('class') or ()
+            if not all(c in classes for c in self.classes): return False
+        for name, op, value in self.attrs:
+            if name not in attrs: return False
+            if op is None: continue
+            actual = ' '.join(attrs[name]) if name == 'class' else attrs[name] or ''
+            if not _ATTR_OPS[op](actual, value): return False
+        return True
+
+    def candidates(self, index: TreeIndex) -> list[Tag]:
+        ''' The smallest list of tags from the index which could match '''
+        if self.id: return index.by_id.get(self.id, [])
+        if self.classes: return min((index.by_class.get(c, []) for c in self.classes), key=len)
+        if self.type and self.type != '*': return index.by_type.get(self.type, [])
+        return index.tags
+
+
+class Selector:
+    ''' A chain of compounds, joined by combinators (``' '``, ``'>'``, ``'+'`` or ``'~'``) '''
+
+    def __init__(self, compounds: list[Compound], combinators: list[str]) -> None:
+        self.compounds = compounds
+        self.combinators = combinators
+
+    def matches(self, tag: Tag, index: TreeIndex, i: Optional[int] = None) -> bool:
+        i = len(self.compounds) - 1 if i is None else i
+        if not self.compounds[i].matches(tag): return False
+        if i == 0: return True
+        combinator = self.combinators[i - 1]
+        if combinator == '>':
+            parent = index.parents.get(tag)
+            return parent is not None and self.matches(parent, index, i - 1)
+        if combinator == ' ':
+            parent = index.parents.get(tag)
+            while parent is not None:
+                if self.matches(parent, index, i - 1): return True
+                parent = index.parents.get(parent)
+            return False
+        siblings = index.previous_siblings(tag)
+        if combinator == '+':
+            sibling = next(iter(siblings), None)
+            return sibling is not None and self.matches(sibling, index, i - 1)
+        return any(self.matches(sibling, index, i - 1) for sibling in siblings)
+
+    def select(self, index: TreeIndex) -> Iterable[Tag]:
+        return (tag for tag in self.compounds[-1].candidates(index) if self.matches(tag, index))
+
+
+class SelectorGroup:
+    ''' A compiled, comma separated, list of selectors '''
+
+    def __init__(self, source: str, selectors: list[Selector]) -> None:
+        self.source = source
+        self.selectors = selectors
+
+    def __repr__(self) -> str: return f'{self.__class__.__qualname__}({self.source!r})'
+
+    def query_all(self, tree: Tag) -> list[Tag]:
+        index = TreeIndex.of(tree)
+        if len(self.selectors) == 1:
+            return list(self.selectors[0].select(index))
+        found = {tag for s in self.selectors for tag in s.select(index)}
+        return sorted(found, key=index.order.__getitem__)
+
+    def query(self, tree: Tag) -> Optional[Tag]:
+        index = TreeIndex.of(tree)
+        matches = (next(iter(s.select(index)), None) for s in self.selectors)
+        return min((tag for tag in matches if tag is not None), key=index.order.__getitem__, default=None)
+
+
+_TOKEN = re_compile(r'''
+    \s*(?P<combinator>[>+~])\s*
+  | \s*(?P<comma>,)\s*
+  | (?P<space>\s+)
+  | (?P<type>\*|[-\w:]+)
+  | \#(?P<id>[-\w]+)
+  | \.(?P<cls>[-\w]+)
+  | \[\s*(?P<attr>[-\w:]+)\s*(?:(?P<op>[~^$*|]?=)\s*(?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'|(?P<uq>[^\]\s]+))\s*)?\]
+''', VERBOSE)
+
+
+@lru_cache(maxsize=256)
+def compile_selector(source: str) -> SelectorGroup:
+    ''' Compiles a CSS selector into a ``SelectorGroup`` which can be run against trees
+
+    Supports type, ``*``, ``#id``, ``.class`` and ``[attr]`` / ``[attr op value]`` selectors,
+    the descendant, ``>``, ``+`` and ``~`` combinators, and comma separated groups.
+    '''
+    selectors, compounds, combinators, compound = [], [], [], Compound()
+    pending = None
+
+    def end_compound():
+        nonlocal compound, pending
+        if not compound:
+            raise ValueError(f'Invalid selector {source!r}: expected a tag, id, class or attribute at {pos}')
+        if pending: combinators.append(pending)
+        compounds.append(compound)
+        compound, pending = Compound(), None
+
+    pos, text = 0, source.strip()
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if match is None:
+            raise ValueError(f'Invalid selector {source!r} at {pos}')
+        kind = match.lastgroup if match.lastgroup not in ('dq', 'sq', 'uq', 'op') else 'attr'
+        if kind in ('combinator', 'space'):
+            end_compound()
+            pending = match['combinator'] or ' '
+        elif kind == 'comma':
+            end_compound()
+            selectors.append(Selector(compounds, combinators))
+            compounds, combinators = [], []
+        elif kind == 'type':
+            if compound: raise ValueError(f'Invalid selector {source!r}: unexpected tag name at {pos}')
+            compound.type = match['type'].lower()
+        elif kind == 'id':
+            compound.id = match['id']
+        elif kind == 'cls':
+            compound.classes.append(match['cls'])
+        else:
+            value = next((v for v in match.group('dq', 'sq', 'uq') if v is not None), None)
+            compound.attrs.append((match['attr'].lower(), match['op'], value))
+        pos = match.end()
+    end_compound()
+    selectors.append(Selector(compounds, combinators))
+    return SelectorGroup(source, selectors)
+
+
+def _compiled(sel: Union[str, Selectable, SelectorGroup]) -> SelectorGroup:
+    if isinstance(sel, SelectorGroup): return sel
+    if isinstance(sel, Selectable): sel = selector(sel)
+    return compile_selector(sel)
+
+
+def query(tree: Tag, sel: Union[str, Selectable, SelectorGroup]) -> Optional[Tag]:
+    ''' Returns the first tag in ``tree`` (including ``tree`` itself) matching ``sel``, or ``None`` '''
+    return _compiled(sel).query(tree)
+
+
+def query_all(tree: Tag, sel: Union[str, Selectable, SelectorGroup]) -> list[Tag]:
+    ''' Returns every tag in ``tree`` (including ``tree`` itself) matching ``sel``, in document order '''
+    return _compiled(sel).query_all(tree)
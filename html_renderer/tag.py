@@ -1,5 +1,6 @@
-from typing import Iterable, NewType, Union
-from xml.etree.ElementTree import Comment, Element, tostring
+from html import escape
+from typing import Iterable, Iterator, NewType, Union
+from xml.etree.ElementTree import Comment, Element
 from .stream import Stream
 import sys
 
@@ -7,33 +8,94 @@ Tag = NewType('Tag', object)
 
 BLANK_ATTR = '{%blank-attr%}'
 
-def _blank_container():
-    return Element('div', {'style': 'display: inline;'})
+VOID_ELEMENTS = frozenset((
+    'area', 'base', 'basefont', 'br', 'col', 'embed', 'frame', 'hr', 'img',
+    'input', 'isindex', 'link', 'meta', 'param', 'source', 'track', 'wbr',
+))
+''' Elements which never have an end tag '''
+
+RAW_TEXT_ELEMENTS = frozenset(('script', 'style'))
+''' Elements whose text is written as is, rather than escaped '''
+
+_intern = sys.intern
+
+class _Attrs(dict):
+    ''' A tag's attributes, which count as a change to its tree whenever they're changed '''
+    __slots__ = ('tag',)
+
+    def __init__(self, tag: 'Tag', attrs: dict):
+        super().__init__(attrs)
+        self.tag = tag
+
+    def __setitem__(self, k, v): super().__setitem__(k, v); self.tag.changed()
+    def __delitem__(self, k): super().__delitem__(k); self.tag.changed()
+    def __ior__(self, other): self.tag.changed(); return super().__ior__(other)
+    def pop(self, *args): self.tag.changed(); return super().pop(*args)
+    def popitem(self): self.tag.changed(); return super().popitem()
+    def setdefault(self, k, v=None): self.tag.changed(); return super().setdefault(k, v)
+    def update(self, *args, **kwargs): self.tag.changed(); super().update(*args, **kwargs)
+    def clear(self): self.tag.changed(); super().clear()
+
+class _TagType(type):
+    ''' Metaclass for tags
+
+    Sets a tag class's ``type`` to its name, in lowercase, unless it or a base declared one.
+    Tag classes which declare ``__slots__`` (as the built-in ones do) carry no ``__dict__``;
+    those which don't can set attributes of their own, as any class can.
+    '''
+
+    def __new__(mcs, name: str, bases: tuple, namespace: dict, **kwargs):
+        declared = namespace.get('type')
+        namespace['_declared_type'] = bool(declared) or any(getattr(b, '_declared_type', False) for b in bases)
+        if declared or not namespace['_declared_type']:
+            namespace['type'] = _intern(declared or name.lower())
+        return super().__new__(mcs, name, bases, namespace, **kwargs)
+
+class Tag(metaclass=_TagType):
+    __slots__ = ('attrs', '_children', '_index', '_parent', '_dirty')
 
-class Tag:
     type: str = None
     is_startend: bool = False
     classes: list[str] = []
 
     def __init__(self, *, attrs: dict = None):
-        self.attrs: dict[str, str] = attrs or {}
-        if 'class' in attrs:
-            if isinstance(attrs['class'], str):
-                attrs['class'] = attrs['class'].split(' ')
-        else:
-            attrs['class'] = []
+        attrs = {_intern(k): v for k, v in attrs.items()} if attrs else {}
+        if 'class' in attrs and isinstance(attrs['class'], str):
+            attrs['class'] = attrs['class'].split(' ')
+        if 'tagtype' in attrs and isinstance(attrs['tagtype'], str):
+            attrs['tagtype'] = _intern(attrs['tagtype'])
+        self.attrs: dict[str, str] = _Attrs(self, attrs)
+        self._children: Union[list[Tag], None] = None
+        self._index = None
+        self._parent: Union[Tag, None] = None
+        self._dirty = True
 
-        self.children: list[Tag] = []
+    @property
+    def children(self) -> Union[list[Tag], tuple]:
+        ''' The tag's children, or an empty tuple until ``add_child`` gives it one '''
+        return self._children if self._children is not None else ()
 
-        if not self.type: self.type = self.__class__.__name__.lower()
+    def __str__(self) -> str: return ''.join(self.iter_html())
 
-    def __str__(self) -> str: return tostring(self.to_tree(), encoding='unicode', method='html').replace(f'="{BLANK_ATTR}"', '')
-        
-    def __repr__(self) -> str: return f'{self.__class__.__qualname__}(attrs={{{self.attr_strings(", ")}}}, children=[{", ".join(repr(child) for child in self.children)}])'
+    def __repr__(self) -> str:
+        parts, counts = [], []
+        for entering, node, _ in walk(self):
+            if entering:
+                if counts:
+                    if counts[-1]: parts.append(', ')
+                    counts[-1] += 1
+                if isinstance(node, Text): parts.append(repr(node))
+                else:
+                    parts.append(f'{node.__class__.__qualname__}(attrs={{{node.attr_strings(", ")}}}, children=[')
+                    counts.append(0)
+            elif not isinstance(node, Text):
+                parts.append('])')
+                counts.pop()
+        return ''.join(parts)
 
     def __getitem__(self, idx: Union[int, str]):
         if isinstance(idx, int):
-            return self.children[int]
+            return self.children[idx]
         elif isinstance(idx, str):
             return self.attrs[idx]
         else:
@@ -48,12 +110,47 @@ class Tag:
         elif isinstance(other, Tag): self.add_child(other)
         return self
 
+    def iter_html(self) -> Iterator[str]:
+        ''' Serializes the tree as HTML, a chunk at a time
+
+        Attributes set to ``None`` are written as boolean attributes, with no value.
+        '''
+        raw = 0
+        for entering, node, _ in walk(self):
+            if isinstance(node, Text):
+                if entering: yield node.content if raw else escape(node.content, quote=False)
+            elif entering:
+                yield f'<{node.type}{node.html_attrs()}>'
+                if node.type in RAW_TEXT_ELEMENTS: raw += 1
+            else:
+                if node.type in RAW_TEXT_ELEMENTS: raw -= 1
+                if node.type not in VOID_ELEMENTS: yield f'</{node.type}>'
+
+    def dump(self, stream: Stream):
+        ''' Writes the tree as HTML to ``stream``, or any other object with a ``write`` method '''
+        for chunk in self.iter_html():
+            stream.write(chunk)
+
+    def html_attrs(self) -> str:
+        attrs = []
+        for k, v in self.attrs.items():
+            if k == 'class': attrs.append(' class="' + escape(' '.join(v)) + '"')
+            elif v is None: attrs.append(' ' + k)
+            else: attrs.append(f' {k}="{escape(v)}"')
+        return ''.join(attrs)
+
     def to_tree(self):
-        this = Element(self.type, self.serializable_attrs())
-        for child in self.children:
-            this.append(child.to_tree())
-        if not self.is_startend and not self.children:
-            this.append(Comment(' '))
+        stack = []
+        for entering, node, _ in walk(self):
+            if not entering:
+                this = stack.pop()
+                if isinstance(node, Tag) and not node.is_startend and not node.children:
+                    this.append(Comment(' '))
+                if stack: stack[-1].append(this)
+            elif isinstance(node, Text):
+                stack.append(_blank_container())
+                stack[-1].text = node.content
+            else: stack.append(Element(node.type, node.serializable_attrs()))
         return this
 
     def attr_strings(self, delim: str = ' ') -> str:
@@ -72,36 +169,83 @@ class Tag:
         return attrs
 
     def print(self, indent=0, end=''):
-        print('    ' * indent + f'{self.__class__.__qualname__}(')
-        indent += 1
-        if len(self.attrs.values()):
-            print('    ' * indent + 'attrs={')
-            indent += 1
-            for attr in self.attr_strings(',\n').split('\n'):
-                print('    ' * indent + attr)
-            indent -= 1
-            print('    ' * indent + '},')
-        else: print('    ' * indent + 'attrs={},')
-
-        if len(self.children):
-            print('    ' * indent + 'children=[')
-            indent += 1
-            for child in self.children:
-                child.print(indent, ',')
-            indent -= 1
-            print('    ' * indent + ']')
-        else: print('    ' * indent + 'children=[]')
-        indent -= 1
-        print('    ' * indent + ')' + end)
+        root_indent, root_end = indent, end
+        for entering, node, depth in walk(self):
+            indent = root_indent + 2 * depth
+            end = root_end if not depth else ','
+            if isinstance(node, Text):
+                if entering: node.print(indent, end)
+            elif entering:
+                print('    ' * indent + f'{node.__class__.__qualname__}(')
+                indent += 1
+                if len(node.attrs.values()):
+                    print('    ' * indent + 'attrs={')
+                    for attr in node.attr_strings(',\n').split('\n'):
+                        print('    ' * (indent + 1) + attr)
+                    print('    ' * indent + '},')
+                else: print('    ' * indent + 'attrs={},')
+                print('    ' * indent + ('children=[' if len(node.children) else 'children=[]'))
+            else:
+                if len(node.children): print('    ' * (indent + 1) + ']')
+                print('    ' * indent + ')' + end)
+
+    def copy(self) -> Tag:
+        ''' Returns a deep copy of the tree, made without recursion, so it works at any depth '''
+        clones = []
+        for entering, node, _ in walk(self):
+            if not entering:
+                clone = clones.pop()
+                continue
+            if isinstance(node, Text): clone = Text(node.content)
+            else:
+                clone = node.__class__.__new__(node.__class__)
+                clone.attrs = _Attrs(clone, {k: list(v) if isinstance(v, list) else v for k, v in node.attrs.items()})
+                clone._children = None
+                clone._index = None
+                clone._parent = None
+                clone._dirty = True
+            if clones: clones[-1].add_child(clone)
+            clones.append(clone)
+        return clone
+
+    def __copy__(self) -> Tag: return self.copy()
+    def __deepcopy__(self, memo: dict) -> Tag: return self.copy()
+
+    def changed(self):
+        ''' Marks the tag, and every tag above it, as changed since their query indexes were built
+
+        A tag is only marked when every tag above it already is, so marking stops at the first
+        tag which was, and building a tree up from the top doesn't walk back up it each time.
+        '''
+        tag = self
+        while tag is not None and not tag._dirty:
+            tag._dirty = True
+            tag = tag._parent
 
     def add_child(self, child: Tag):
-        self.children.append(child)
+        if self._children is None: self._children = []
+        self._children.append(child)
+        if isinstance(child, Tag): child._parent = self
+        self.changed()
 
     def add_class(self, cls: str):
         if 'class' not in self.attrs: self.attrs['class'] = []
         self.attrs['class'].append(cls)
+        self.changed()
+
+    def reindex(self):
+        ''' Drops the query index built on this tag
+
+        Changing the tree through ``add_child``, ``add_class`` or ``attrs`` already makes the
+        index rebuild on its next query, so this only frees its memory early.
+        '''
+        self._index = None
 
 class Text:
+    __slots__ = ('content',)
+
+    children: tuple = ()
+
     def __init__(self, content: str = ''):
         self.content = content
 
@@ -111,10 +255,39 @@ class Text:
     def __repr__(self) -> str:
         return self.__class__.__name__ + f'(content=\'{self.content}\')'
 
-    def to_tree(self):
-        stem = _blank_container()
-        stem.text = self.content
-        return stem
+    def iter_html(self) -> Iterator[str]:
+        yield escape(self.content, quote=False)
+
+    to_tree = Tag.to_tree
 
     def print(self, indent=0, end='') -> str:
         print('    ' * indent + repr(self) + end)
+
+
+Node = Union[Tag, Text]
+
+def walk(root: Node) -> Iterator[tuple[bool, Node, int]]:
+    ''' Walks a tree depth first, without recursion
+
+    Yields ``(True, node, depth)`` on the way into each node, and ``(False, node, depth)``
+    on the way back out, after all of its children, so depth is only bounded by memory.
+    '''
+    yield True, root, 0
+    stack = [(root, iter(root.children))]
+    while stack:
+        node, children = stack[-1]
+        for child in children:
+            yield True, child, len(stack)
+            stack.append((child, iter(child.children)))
+            break
+        else:
+            stack.pop()
+            yield False, node, len(stack)
+
+def iter_preorder(root: Node) -> Iterator[Node]:
+    ''' Yields every node in a tree, each before its children '''
+    return (node for entering, node, _ in walk(root) if entering)
+
+def iter_postorder(root: Node) -> Iterator[Node]:
+    ''' Yields every node in a tree, each after its children '''
+    return (node for entering, node, _ in walk(root) if not entering)
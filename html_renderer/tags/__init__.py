@@ -1,8 +1,32 @@
+from typing import Optional
+
 from ..tag import Tag, Text
-from .default import *
+from . import default
+from .registry import TagRegistry
+
+registry = TagRegistry()
+registry.add(Tag)
+for key, (module, attr) in default.INDEX.items():
+    registry.add_lazy(key, f'{default.__name__}.{module}', attr)
+
+
+def __getattr__(name: str):
+    ''' Resolves the default tags (``from html_renderer.tags import Div``) lazily, through ``default`` '''
+    try:
+        return getattr(default, name)
+    except AttributeError:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}') from None
+
+
+def register(tag: Optional[type] = None, *, name: Optional[str] = None, namespace: Optional[str] = None):
+    ''' Registers a ``Tag`` subclass, under its class name unless ``name`` is given
+
+    Usable as a plain decorator, or called with a ``name`` and ``namespace`` first.
+    '''
+    def decorator(tag: type) -> type:
+        return registry.add(tag, name=name, namespace=namespace)
+    return decorator if tag is None else decorator(tag)
+
 
-def get_tag(tag_name: str, default=Tag) -> type:
-    return {
-        name.lower(): tag 
-    for name, tag in globals().items()
-    if isinstance(tag, type) and issubclass(tag, Tag) }.get(tag_name, default)
+def get_tag(tag_name: str, default=Tag, namespace: Optional[str] = None) -> type:
+    return registry.get(tag_name, default, namespace)
@@ -0,0 +1,5 @@
+''' Regenerates the default tags' index: ``python -m html_renderer.tags`` '''
+
+from .registry import write_index
+
+print(write_index())
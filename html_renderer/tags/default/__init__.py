@@ -1,10 +1,24 @@
+''' The standard HTML tags
+
+Each tag's module is only imported the first time one of its tags is used, found through
+the generated ``_index`` (regenerate it with ``python -m html_renderer.tags``).
+'''
+
+from importlib import import_module
+
 from .. import Tag, Text
-from .block import *
-from .form import *
-from .header import *
-from .media import *
-from .misc import *
-from .ruby import *
-from .table import *
-from .text import *
-from .whitespace import *
+from ._index import INDEX
+
+_MODULES = {attr: module for module, attr in INDEX.values()}
+
+
+def __getattr__(name: str):
+    module = _MODULES.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    tag = globals()[name] = getattr(import_module(f'.{module}', __name__), name)
+    return tag
+
+
+def __dir__() -> list[str]:
+    return sorted(globals().keys() | _MODULES.keys())
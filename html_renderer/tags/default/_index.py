@@ -0,0 +1,137 @@
+# Generated by ``python -m html_renderer.tags``, don't edit by hand
+# Maps each tag's registry key to the module (in this package) and name it's defined under
+
+INDEX: dict[str, tuple[str, str]] = {
+    'a': ('text', 'A'),
+    'abbr': ('text', 'Abbr'),
+    'acronym': ('text', 'Acronym'),
+    'address': ('text', 'Address'),
+    'applet': ('media', 'Applet'),
+    'area': ('form', 'Area'),
+    'article': ('block', 'Article'),
+    'aside': ('block', 'Aside'),
+    'audio': ('media', 'Audio'),
+    'b': ('text', 'B'),
+    'base': ('media', 'Base'),
+    'basefont': ('media', 'BaseFont'),
+    'bb': ('text', 'BB'),
+    'bdi': ('text', 'BDI'),
+    'bdo': ('text', 'BDO'),
+    'big': ('text', 'Big'),
+    'blockquote': ('text', 'BlockQuote'),
+    'body': ('block', 'Body'),
+    'br': ('whitespace', 'Br'),
+    'button': ('form', 'Button'),
+    'canvas': ('media', 'Canvas'),
+    'caption': ('table', 'Caption'),
+    'center': ('text', 'Center'),
+    'cite': ('text', 'Cite'),
+    'code': ('text', 'Code'),
+    'col': ('table', 'Col'),
+    'colgroup': ('table', 'ColGroup'),
+    'command': ('misc', 'Command'),
+    'datagrid': ('form', 'DataGrid'),
+    'datalist': ('form', 'DataList'),
+    'dd': ('text', 'DD'),
+    'del': ('text', 'Del'),
+    'details': ('misc', 'Details'),
+    'dfn': ('text', 'Dfn'),
+    'dialog': ('text', 'Dialog'),
+    'dir': ('text', 'Dir'),
+    'div': ('block', 'Div'),
+    'dl': ('text', 'DL'),
+    'dt': ('text', 'DT'),
+    'em': ('text', 'Em'),
+    'embed': ('media', 'Embed'),
+    'eventsource': ('misc', 'EventSource'),
+    'fieldset': ('form', 'FieldSet'),
+    'figcaption': ('block', 'FigCaption'),
+    'figure': ('block', 'Figure'),
+    'font': ('media', 'Font'),
+    'footer': ('block', 'Footer'),
+    'form': ('form', 'Form'),
+    'frame': ('media', 'Frame'),
+    'frameset': ('media', 'FrameSet'),
+    'h1': ('header', 'H1'),
+    'h2': ('header', 'H2'),
+    'h3': ('header', 'H3'),
+    'h4': ('header', 'H4'),
+    'h5': ('header', 'H5'),
+    'h6': ('header', 'H6'),
+    'head': ('block', 'Head'),
+    'header': ('block', 'Header'),
+    'hgroup': ('header', 'HGroup'),
+    'hr': ('whitespace', 'Hr'),
+    'html': ('block', 'HTML'),
+    'i': ('text', 'I'),
+    'iframe': ('media', 'IFrame'),
+    'img': ('media', 'Img'),
+    'input': ('form', 'Input'),
+    'ins': ('text', 'Ins'),
+    'isindex': ('form', 'IsIndex'),
+    'kbd': ('form', 'KBD'),
+    'keygen': ('form', 'KeyGen'),
+    'label': ('form', 'Label'),
+    'legend': ('form', 'Legend'),
+    'li': ('text', 'LI'),
+    'link': ('media', 'Link'),
+    'main': ('block', 'Main'),
+    'map': ('media', 'Map'),
+    'mark': ('text', 'Mark'),
+    'menu': ('text', 'Menu'),
+    'menuitem': ('text', 'MenuItem'),
+    'meta': ('media', 'Meta'),
+    'meter': ('misc', 'Meter'),
+    'nav': ('block', 'Nav'),
+    'noscript': ('media', 'NoScript'),
+    'object': ('media', 'Object'),
+    'ol': ('text', 'OL'),
+    'optgroup': ('form', 'OptGroup'),
+    'option': ('form', 'Option'),
+    'output': ('text', 'Output'),
+    'p': ('text', 'P'),
+    'param': ('media', 'Param'),
+    'picture': ('media', 'Picture'),
+    'pre': ('text', 'Pre'),
+    'progress': ('misc', 'Progress'),
+    'q': ('text', 'Q'),
+    'rb': ('ruby', 'Rb'),
+    'rp': ('ruby', 'Rp'),
+    'rt': ('ruby', 'Rt'),
+    'rtc': ('ruby', 'Rtc'),
+    'ruby': ('ruby', 'Ruby'),
+    's': ('text', 'S'),
+    'sample': ('text', 'Sample'),
+    'script': ('media', 'Script'),
+    'section': ('block', 'Section'),
+    'select': ('form', 'Select'),
+    'slot': ('misc', 'Slot'),
+    'small': ('text', 'Small'),
+    'source': ('media', 'Source'),
+    'span': ('block', 'Span'),
+    'strike': ('text', 'Strike'),
+    'strong': ('text', 'Strong'),
+    'style': ('media', 'Style'),
+    'sub': ('text', 'Sub'),
+    'summary': ('misc', 'Summary'),
+    'sup': ('text', 'Sup'),
+    'svg': ('media', 'SVG'),
+    'table': ('table', 'Table'),
+    'tbody': ('table', 'TBody'),
+    'td': ('table', 'TD'),
+    'template': ('misc', 'Template'),
+    'textarea': ('form', 'TextArea'),
+    'tfoot': ('table', 'TFoot'),
+    'th': ('table', 'TH'),
+    'thead': ('table', 'THead'),
+    'time': ('misc', 'Time'),
+    'title': ('text', 'Title'),
+    'tr': ('table', 'TR'),
+    'track': ('media', 'Track'),
+    'tt': ('text', 'TT'),
+    'u': ('text', 'U'),
+    'ul': ('text', 'UL'),
+    'var': ('text', 'Var'),
+    'video': ('media', 'Video'),
+    'wbr': ('whitespace', 'Wbr'),
+}
@@ -1,17 +1,17 @@
 from . import Tag
 
-class Article(Tag): pass
-class Aside(Tag): pass
-class Div(Tag): pass
-class FigCaption(Tag): pass
-class Figure(Tag): pass
-class Footer(Tag): pass
-class Header(Tag): pass
-class Main(Tag): pass
-class Nav(Tag): pass
-class Section(Tag): pass
-class Span(Tag): pass
+class Article(Tag): __slots__ = ()
+class Aside(Tag): __slots__ = ()
+class Div(Tag): __slots__ = ()
+class FigCaption(Tag): __slots__ = ()
+class Figure(Tag): __slots__ = ()
+class Footer(Tag): __slots__ = ()
+class Header(Tag): __slots__ = ()
+class Main(Tag): __slots__ = ()
+class Nav(Tag): __slots__ = ()
+class Section(Tag): __slots__ = ()
+class Span(Tag): __slots__ = ()
 
-class Body(Tag): pass
-class Head(Tag): pass
-class HTML(Tag): pass
+class Body(Tag): __slots__ = ()
+class Head(Tag): __slots__ = ()
+class HTML(Tag): __slots__ = ()
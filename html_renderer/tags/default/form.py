@@ -1,21 +1,21 @@
 from . import Tag
 
-class FieldSet(Tag): pass
-class Form(Tag): pass
+class FieldSet(Tag): __slots__ = ()
+class Form(Tag): __slots__ = ()
 
-class Button(Tag): pass
-class Input(Tag): pass
-class KBD(Tag): pass
-class KeyGen(Tag): pass
-class Label(Tag): pass
-class Legend(Tag): pass
-class TextArea(Tag): pass
+class Button(Tag): __slots__ = ()
+class Input(Tag): __slots__ = ()
+class KBD(Tag): __slots__ = ()
+class KeyGen(Tag): __slots__ = ()
+class Label(Tag): __slots__ = ()
+class Legend(Tag): __slots__ = ()
+class TextArea(Tag): __slots__ = ()
 
-class DataGrid(Tag): pass
-class DataList(Tag): pass
-class OptGroup(Tag): pass
-class Option(Tag): pass
-class Select(Tag): pass
+class DataGrid(Tag): __slots__ = ()
+class DataList(Tag): __slots__ = ()
+class OptGroup(Tag): __slots__ = ()
+class Option(Tag): __slots__ = ()
+class Select(Tag): __slots__ = ()
 
-class Area(Tag): pass
-class IsIndex(Tag): pass
+class Area(Tag): __slots__ = ()
+class IsIndex(Tag): __slots__ = ()
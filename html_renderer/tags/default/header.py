@@ -1,9 +1,9 @@
 from . import Tag
 
-class H1(Tag): pass
-class H2(Tag): pass
-class H3(Tag): pass
-class H4(Tag): pass
-class H5(Tag): pass
-class H6(Tag): pass
-class HGroup(Tag): pass
+class H1(Tag): __slots__ = ()
+class H2(Tag): __slots__ = ()
+class H3(Tag): __slots__ = ()
+class H4(Tag): __slots__ = ()
+class H5(Tag): __slots__ = ()
+class H6(Tag): __slots__ = ()
+class HGroup(Tag): __slots__ = ()
@@ -1,33 +1,33 @@
 from . import Tag
 
-class Audio(Tag): pass
-class Img(Tag): pass
-class Map(Tag): pass
-class Picture(Tag): pass
-class Source(Tag): pass
-class SVG(Tag): pass
-class Track(Tag): pass
-class Video(Tag): pass
+class Audio(Tag): __slots__ = ()
+class Img(Tag): __slots__ = ()
+class Map(Tag): __slots__ = ()
+class Picture(Tag): __slots__ = ()
+class Source(Tag): __slots__ = ()
+class SVG(Tag): __slots__ = ()
+class Track(Tag): __slots__ = ()
+class Video(Tag): __slots__ = ()
 
 # Inteded for Flash (override?)
-class Applet(Tag): type = 'object'
-class Embed(Tag): pass
+class Applet(Tag): type = 'object'; __slots__ = ()
+class Embed(Tag): __slots__ = ()
 
 # Flash, web pages, applets, PDFs
-class Object(Tag): pass
-class Param(Tag): pass
+class Object(Tag): __slots__ = ()
+class Param(Tag): __slots__ = ()
 
-class Canvas(Tag): pass
-class Frame(Tag): pass
-class FrameSet(Tag): pass
-class IFrame(Tag): pass
+class Canvas(Tag): __slots__ = ()
+class Frame(Tag): __slots__ = ()
+class FrameSet(Tag): __slots__ = ()
+class IFrame(Tag): __slots__ = ()
 
-class Link(Tag): pass
-class Meta(Tag): pass
-class NoScript(Tag): pass
-class Script(Tag): pass
-class Style(Tag): pass
+class Link(Tag): __slots__ = ()
+class Meta(Tag): __slots__ = ()
+class NoScript(Tag): __slots__ = ()
+class Script(Tag): __slots__ = ()
+class Style(Tag): __slots__ = ()
 
-class Base(Tag): pass
-class BaseFont(Tag): pass
-class Font(Tag): pass
+class Base(Tag): __slots__ = ()
+class BaseFont(Tag): __slots__ = ()
+class Font(Tag): __slots__ = ()
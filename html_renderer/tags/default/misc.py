@@ -1,15 +1,15 @@
 from .import Tag
 
-class Meter(Tag): pass
-class Progress(Tag): pass
+class Meter(Tag): __slots__ = ()
+class Progress(Tag): __slots__ = ()
 
-class Details(Tag): pass
-class Summary(Tag): pass
+class Details(Tag): __slots__ = ()
+class Summary(Tag): __slots__ = ()
 
-class Slot(Tag): pass
-class Template(Tag): pass
+class Slot(Tag): __slots__ = ()
+class Template(Tag): __slots__ = ()
 
-class Time(Tag): pass
+class Time(Tag): __slots__ = ()
 
-class Command(Tag): pass
-class EventSource(Tag): pass
+class Command(Tag): __slots__ = ()
+class EventSource(Tag): __slots__ = ()
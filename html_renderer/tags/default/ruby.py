@@ -1,7 +1,7 @@
 from . import Tag
 
-class Rb(Tag): pass
-class Rp(Tag): pass
-class Rt(Tag): pass
-class Rtc(Tag): pass
-class Ruby(Tag): pass
+class Rb(Tag): __slots__ = ()
+class Rp(Tag): __slots__ = ()
+class Rt(Tag): __slots__ = ()
+class Rtc(Tag): __slots__ = ()
+class Ruby(Tag): __slots__ = ()
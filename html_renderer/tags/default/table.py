@@ -1,15 +1,15 @@
 from . import Tag
 
-class Table(Tag): pass
-class TBody(Tag): pass
-class TFoot(Tag): pass
-class THead(Tag): pass
+class Table(Tag): __slots__ = ()
+class TBody(Tag): __slots__ = ()
+class TFoot(Tag): __slots__ = ()
+class THead(Tag): __slots__ = ()
 
-class TD(Tag): pass
-class TH(Tag): pass
-class TR(Tag): pass
+class TD(Tag): __slots__ = ()
+class TH(Tag): __slots__ = ()
+class TR(Tag): __slots__ = ()
 
-class Caption(Tag): pass
+class Caption(Tag): __slots__ = ()
 
-class Col(Tag): pass
-class ColGroup(Tag): pass
+class Col(Tag): __slots__ = ()
+class ColGroup(Tag): __slots__ = ()
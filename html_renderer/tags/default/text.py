@@ -1,60 +1,60 @@
 from . import Tag
 
-class P(Tag): pass
+class P(Tag): __slots__ = ()
 
-class A(Tag): pass
-class BB(Tag): pass
+class A(Tag): __slots__ = ()
+class BB(Tag): __slots__ = ()
 
-class Abbr(Tag): pass
-class Acronym(Tag): type = 'abbr'
-class Address(Tag): pass
+class Abbr(Tag): __slots__ = ()
+class Acronym(Tag): type = 'abbr'; __slots__ = ()
+class Address(Tag): __slots__ = ()
 
-class B(Tag): pass
-class I(Tag): pass
-class S(Tag): pass
-class U(Tag): pass
+class B(Tag): __slots__ = ()
+class I(Tag): __slots__ = ()
+class S(Tag): __slots__ = ()
+class U(Tag): __slots__ = ()
 
-class Em(Tag): pass
-class Big(Tag): pass
-class Center(Tag): pass
-class Small(Tag): pass
-class Strike(Tag): pass
-class Strong(Tag): pass
+class Em(Tag): __slots__ = ()
+class Big(Tag): __slots__ = ()
+class Center(Tag): __slots__ = ()
+class Small(Tag): __slots__ = ()
+class Strike(Tag): __slots__ = ()
+class Strong(Tag): __slots__ = ()
 
-class BlockQuote(Tag): pass
-class Q(Tag): pass
+class BlockQuote(Tag): __slots__ = ()
+class Q(Tag): __slots__ = ()
 
-class Cite(Tag): pass
-class Dfn(Tag): pass
+class Cite(Tag): __slots__ = ()
+class Dfn(Tag): __slots__ = ()
 
-class DD(Tag): pass
-class DL(Tag): pass
-class DT(Tag): pass
-class LI(Tag): pass
-class OL(Tag): pass
-class UL(Tag): pass
+class DD(Tag): __slots__ = ()
+class DL(Tag): __slots__ = ()
+class DT(Tag): __slots__ = ()
+class LI(Tag): __slots__ = ()
+class OL(Tag): __slots__ = ()
+class UL(Tag): __slots__ = ()
 
-class Dir(Tag): type = 'ul'
-class Menu(Tag): pass
-class MenuItem(Tag): pass
+class Dir(Tag): type = 'ul'; __slots__ = ()
+class Menu(Tag): __slots__ = ()
+class MenuItem(Tag): __slots__ = ()
 
-class Del(Tag): pass
-class Ins(Tag): pass
-class Mark(Tag): pass
+class Del(Tag): __slots__ = ()
+class Ins(Tag): __slots__ = ()
+class Mark(Tag): __slots__ = ()
 
-class Sub(Tag): pass
-class Sup(Tag): pass
+class Sub(Tag): __slots__ = ()
+class Sup(Tag): __slots__ = ()
 
-class Title(Tag): pass
+class Title(Tag): __slots__ = ()
 
-class BDI(Tag): pass
-class BDO(Tag): pass
+class BDI(Tag): __slots__ = ()
+class BDO(Tag): __slots__ = ()
 
-class Code(Tag): pass
-class Output(Tag): pass
-class Pre(Tag): pass
-class Sample(Tag): pass
-class TT(Tag): pass
-class Var(Tag): pass
+class Code(Tag): __slots__ = ()
+class Output(Tag): __slots__ = ()
+class Pre(Tag): __slots__ = ()
+class Sample(Tag): __slots__ = ()
+class TT(Tag): __slots__ = ()
+class Var(Tag): __slots__ = ()
 
-class Dialog(Tag): pass
+class Dialog(Tag): __slots__ = ()
@@ -1,5 +1,5 @@
 from . import Tag
 
-class Br(Tag): pass
-class Hr(Tag): pass
-class Wbr(Tag): pass
+class Br(Tag): __slots__ = ()
+class Hr(Tag): __slots__ = ()
+class Wbr(Tag): __slots__ = ()
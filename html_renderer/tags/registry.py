@@ -0,0 +1,105 @@
+from importlib import import_module
+from os.path import join
+from pkgutil import iter_modules
+from typing import Iterable, Optional
+
+from ..tag import Tag
+
+ENTRY_POINT_GROUP = 'html_renderer.tags'
+DEFAULT_PACKAGE = 'html_renderer.tags.default'
+
+
+class TagRegistry:
+    ''' Maps tag names to the ``Tag`` classes used to parse them
+
+    Names are case-insensitive. A namespaced tag is registered and looked up as
+    ``'{namespace}:{name}'``, so plugins can add tags without clashing with the defaults.
+    Tags from installed plugins (the ``html_renderer.tags`` entry point group) are only
+    loaded the first time a lookup misses, and tags added with ``add_lazy`` are only
+    imported the first time they're looked up.
+    '''
+
+    def __init__(self) -> None:
+        self.tags: dict[str, type] = {}
+        self.lazy: dict[str, tuple[str, str]] = {}
+        self._entry_points_loaded = False
+
+    def __contains__(self, name: str) -> bool: return self.get(name) is not None
+    def __len__(self) -> int: return len(self.tags.keys() | self.lazy.keys())
+
+    @staticmethod
+    def key(name: str, namespace: Optional[str] = None) -> str:
+        return (f'{namespace}:{name}' if namespace else name).lower()
+
+    def add(self, tag: type, name: Optional[str] = None, namespace: Optional[str] = None) -> type:
+        if not (isinstance(tag, type) and issubclass(tag, Tag)):
+            raise TypeError(f'Expected a subclass of Tag (got {tag!r})')
+        key = self.key(name or tag.__name__, namespace)
+        self.tags[key] = tag
+        self.lazy.pop(key, None)
+        return tag
+
+    def add_lazy(self, name: str, module: str, attr: str, namespace: Optional[str] = None) -> None:
+        ''' Registers the tag ``attr`` of ``module``, without importing it until it's looked up '''
+        key = self.key(name, namespace)
+        if key not in self.tags:
+            self.lazy[key] = module, attr
+
+    def update(self, tags: Iterable[type], namespace: Optional[str] = None) -> None:
+        for tag in tags:
+            self.add(tag, namespace=namespace)
+
+    def get(self, name: str, default: Optional[type] = None, namespace: Optional[str] = None) -> Optional[type]:
+        key = self.key(name, namespace)
+        tag = self.tags.get(key)
+        if tag is None and key in self.lazy:
+            module, attr = self.lazy[key]
+            tag = self.add(getattr(import_module(module), attr), name=key)
+        if tag is None and not self._entry_points_loaded:
+            self.load_entry_points()
+            tag = self.tags.get(key)
+        return default if tag is None else tag
+
+    def load_entry_points(self) -> None:
+        ''' Registers the tags from every installed plugin
+
+        An entry point can name a ``Tag`` subclass, registered under the entry point's name,
+        or a module, whose ``Tag`` subclasses are all registered in the entry point's name as a namespace.
+        '''
+        from importlib.metadata import entry_points
+
+        self._entry_points_loaded = True
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+            loaded = entry_point.load()
+            if isinstance(loaded, type):
+                self.add(loaded, name=entry_point.name)
+            else:
+                self.update((v for v in vars(loaded).values() if isinstance(v, type) and issubclass(v, Tag)), namespace=entry_point.name)
+
+
+def build_index(package: str = DEFAULT_PACKAGE) -> dict[str, tuple[str, str]]:
+    ''' Maps the registry key of every ``Tag`` subclass defined in ``package``'s modules to its module and name
+
+    Modules are read in name order, so a tag defined twice is indexed from the last one.
+    '''
+    index = {}
+    for info in sorted(iter_modules(import_module(package).__path__), key=lambda info: info.name):
+        if info.name.startswith('_'): continue
+        module = import_module(f'{package}.{info.name}')
+        for attr, value in vars(module).items():
+            if isinstance(value, type) and issubclass(value, Tag) and value.__module__ == module.__name__:
+                index[TagRegistry.key(attr)] = info.name, attr
+    return index
+
+
+def write_index(package: str = DEFAULT_PACKAGE) -> str:
+    ''' Regenerates ``package``'s ``_index.py``, which ``html_renderer.tags`` loads tags through, returning its path '''
+    lines = ''.join(f'    {key!r}: {entry!r},\n' for key, entry in sorted(build_index(package).items()))
+    path = join(import_module(package).__path__[0], '_index.py')
+    with open(path, 'w') as f:
+        f.write(
+            f"# Generated by ``python -m html_renderer.tags``, don't edit by hand\n"
+            f"# Maps each tag's registry key to the module (in this package) and name it's defined under\n\n"
+            f'INDEX: dict[str, tuple[str, str]] = {{\n{lines}}}\n'
+        )
+    return path
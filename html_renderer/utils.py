@@ -1,11 +1,27 @@
+from functools import lru_cache
+from html.entities import html5
+from os import environ
 from os.path import dirname, abspath, join
+from types import MappingProxyType
 
+MARKUP_CHARREFS = frozenset(('&amp;', '&lt;', '&gt;', '&quot;', '&apos;'))
 
-def load_charrefs():
-    pass
 
-def get_parameters():
-    pass
+@lru_cache(maxsize=None)
+def load_charrefs() -> MappingProxyType:
+    ''' Maps each HTML5 named character reference (as ``'&name;'``) to its text, built once and shared
+
+    The references significant in markup (``MARKUP_CHARREFS``) are left out, so decoding
+    never changes the structure of the output, as are the legacy forms without a ``;``.
+    '''
+    return MappingProxyType({
+        ref: text for name, text in html5.items() if name.endswith(';') and (ref := '&' + name) not in MARKUP_CHARREFS
+    })
+
+def get_parameters(method='GET'):
+    return ()
 
 
 TEMPLATES_PATH = join(dirname(dirname(abspath(__file__))), 'templates')
+# Compiled templates are only kept on disk when $HTML_RENDERER_CACHE names a directory for them
+BYTECODE_CACHE_PATH = environ.get('HTML_RENDERER_CACHE') or None
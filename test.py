@@ -1,10 +1,31 @@
+import subprocess
+import sys
+from asyncio import run, sleep
+from os import environ, listdir, makedirs, stat, umask
 from os.path import abspath, dirname, join
 from unittest import TestCase, main
 
-# from html_renderer.parser import Parser
+from html_renderer.merge import Merge, render_batch
+from html_renderer.parser import Parser, iterparse
+from html_renderer.profiling import Profile
+from collections import defaultdict
+from tempfile import TemporaryDirectory
+
+from html_renderer import ContextItem, _Renderer, iter_render, render_many
+from html_renderer.aio import iter_render_async, preload, render_async
+from html_renderer.build import build
+from html_renderer.cache import BytecodeCache, DiskFragmentCache, Fragment, FragmentCache, LRUCache, MemoryFragmentCache, SourceCache, tree_cache
+from html_renderer.compiler import compile_template
+from html_renderer.context import Context
 from html_renderer.attributes import Attributes, Class
 from html_renderer.attributes.id import Id
-from html_renderer.selector import selector
+from html_renderer.selector import TreeIndex, query, query_all, selector
+from html_renderer.tag import Tag, Text, iter_postorder, iter_preorder
+from html_renderer.tags import get_tag, register
+from html_renderer.tags.default import INDEX
+from html_renderer.tags.registry import build_index
+from html_renderer.utils import load_charrefs
+from html_renderer.tags.default.block import Div
 
 log_file = join(dirname(abspath(__file__)), 'log.txt')
 
@@ -58,4 +79,514 @@ class TestRenderer(TestCase):
         log(attrs)
         log(attrs, method=selector)
 
+    def test_populate(self):
+        log('test_populate')
+        r = _Renderer(context=defaultdict(ContextItem, name='a.b c'))
+        r.charrefs = {'&amp;': '&'}
+        self.assertEqual(r.populate('{{ name }}, {{name}} &amp; {{ missing }}{& x &}'), 'a.b c, a.b c & ')
+        self.assertEqual(r.populate('{{ x1 }}'), '{{ x1 }}')
+        r._handle_set({'name': 'd'})
+        self.assertEqual(r.populate('{{ name }}'), 'd')
+        log(r.substitutions)
+
+    def test_charrefs(self):
+        log('test_charrefs')
+        template = '<p title="{{ name }}">&copy; {{ name }} &amp; &bogus;</p>'
+        outputs = []
+        for decode in (True, False):
+            r = _Renderer(context={'name': 'a &hellip; &lt;b&gt;'}, decode_charrefs=decode)
+            r.render_text(template)
+            outputs.append(r.out.read())
+        self.assertEqual(outputs, [
+            '<p title="a … &lt;b&gt;">\n©\n a … &lt;b&gt; \n&amp;\n \n&bogus;\n</p>',
+            '<p title="a &hellip; &lt;b&gt;">\n&copy;\n a &hellip; &lt;b&gt; \n&amp;\n \n&bogus;\n</p>',
+        ])
+        for render in (_Renderer.render_text, _Renderer.feed):
+            r = _Renderer(context={'x': 'y'})
+            render(r, '<pre>\nif a &lt; b &amp;&amp; c:&#32;{{ x }}\n</pre>')
+            self.assertEqual(r.out.read(), '<pre >\nif a &lt; b &amp;&amp; c:&#32;y\n</pre>')
+        self.assertIs(load_charrefs(), load_charrefs())
+        self.assertNotIn('&amp;', load_charrefs())
+        log(outputs)
+
+    def test_Context(self):
+        log('test_Context')
+        caller = {'name': 'a%20b', 'other': ContextItem('other', 'c')}
+        context = Context(caller)
+        self.assertEqual(len(context), 2)
+        self.assertEqual(context['name'].raw_v, 'a b')
+        self.assertIsNone(context['name']._search)
+        child = context.new_child()
+        child['name'] = 'd'
+        self.assertEqual((child['name'].raw_v, context['name'].raw_v), ('d', 'a b'))
+        self.assertEqual(sorted(child), ['name', 'other'])
+        self.assertEqual(caller['name'], 'a%20b')
+        self.assertIsNone(context.get('missing'))
+
+        with TemporaryDirectory() as tmp:
+            makedirs(join(tmp, 'templates'))
+            with open(join(tmp, 'templates', 'part.html'), 'w') as f:
+                f.write('{{ name }}<set name="changed"/>')
+            r = _Renderer(context=caller, templates_path=tmp)
+            r.render_text('<p>{{ name }}</p><include src="part.html"/><p>{{ name }}</p>')
+        self.assertEqual(r.out.read(), '<p >\na b\n</p>\na b\n<p >\nchanged\n</p>')
+        self.assertEqual(caller['name'], 'a%20b')
+        log(r.context)
+
+    def test_compile_template(self):
+        log('test_compile_template')
+        template = '<row><p class="x">{{ name }}</p><code>\n{{ name }}\n</code><top/><paragraph class="{{ name }}">x</paragraph></row>'
+        self.assertIs(compile_template(template, _Renderer), compile_template(template, _Renderer))
+        consts = compile_template(template, _Renderer).__code__.co_consts
+        self.assertNotIn('row', consts)
+        self.assertNotIn('top', consts)
+        self.assertIn('paragraph', consts)
+        self.assertEqual(_Renderer.starts['image-block'], _Renderer.starts['image_block'])
+
+        class Custom(_Renderer):
+            def _handle_note_start(self, attrs): return '<aside>'
+
+        self.assertIn('note', Custom.starts)
+        self.assertNotIn('note', _Renderer.starts)
+
+        class Methods(_Renderer):
+            @staticmethod
+            def _handle_hr(attrs): return '<hr/>'
+
+            @classmethod
+            def _handle_kbd_start(cls, attrs): return f'<kbd data-by="{cls.__name__}">'
+
+        r = Methods()
+        r.render_text('<hr/><kbd>x</kbd><em>y</em>')
+        self.assertEqual(r.out.read(), '<hr/>\n<kbd data-by="Methods">\nx\n</kbd>\n<em >\ny\n</em>')
+        Methods._handle_em_start = _Renderer._static(lambda self, attrs: '<i>')
+        Methods.build_dispatch()
+        r = Methods()
+        r.render_text('<hr/><kbd>x</kbd><em>y</em>')
+        self.assertEqual(r.out.read(), '<hr/>\n<kbd data-by="Methods">\nx\n</kbd>\n<i>\ny\n</em>')
+        outputs = []
+        for render in (_Renderer.render_text, _Renderer.feed):
+            r = _Renderer(context=defaultdict(ContextItem, name='a'))
+            render(r, template)
+            outputs.append(r.out.read())
+        self.assertEqual(*outputs)
+        log(outputs[0])
+
+    def test_bytecode_cache(self):
+        log('test_bytecode_cache')
+
+        def renderer(value):
+            class Versioned(_Renderer):
+                def make_tag_start(self, tag, attrs=None): return f'<{tag} data-v="{value}">'
+
+                @_Renderer._static
+                def _handle_badge(self, _): return f'<b>{value}</b>'
+            return Versioned
+
+        with TemporaryDirectory() as tmp:
+            outputs = []
+            for value in ('one', 'two'):
+                Versioned = renderer(value)
+                Versioned.bytecode = BytecodeCache(tmp, max_files=4)
+                r = Versioned()
+                r.render_text('<p>x</p><badge/>')
+                outputs.append(r.out.read())
+            self.assertEqual(outputs, [f'<p data-v="{v}">\nx\n</p>\n<b>{v}</b>' for v in ('one', 'two')])
+            cache = BytecodeCache(tmp, max_files=2)
+            code = compile('x = 1', '<test>', 'exec')
+            for key in 'abc':
+                cache.put(key, code)
+            self.assertEqual(len(cache.files()), 2)
+            self.assertEqual(cache.get('c'), code)
+            cache.clear()
+            self.assertEqual(cache.files(), [])
+        if not environ.get('HTML_RENDERER_CACHE'):
+            self.assertIsNone(_Renderer.bytecode.path)
+        log(outputs)
+
+    def test_render_stream(self):
+        log('test_render_stream')
+        r = _Renderer(context=defaultdict(ContextItem, name='a'))
+        r.render_text('<block name="main"><p>{{ name }}</p></block><div><block name="main"/></div>')
+        self.assertEqual(r.out.read(), '<div >\n<p >\na\n</p>\n</div>')
+        self.assertEqual(''.join(r.out), r.out.read())
+        log(r.out)
+
+    def test_iter_render(self):
+        log('test_iter_render')
+        with TemporaryDirectory() as tmp:
+            path = join(tmp, 'page.html')
+            with open(path, 'w') as f:
+                f.write('<block name="main"><p>é</p></block><row>' + '<p>{{ text }}</p>' * 200 + '<block name="main"/></row>')
+            chunks = list(iter_render(path, chunk_size=64, context=defaultdict(ContextItem, text='text')))
+            self.assertGreater(len(chunks), 10)
+            r = _Renderer(context=defaultdict(ContextItem, text='text'))
+            r.render(path)
+            self.assertEqual(b''.join(chunks), r.out.read().encode())
+            first = iter_render(path, chunk_size=64)
+            self.assertTrue(next(first).startswith(b'<div class="row">'))
+            first.close()
+            with open(path, 'w') as f:
+                f.write('<row><include src="missing.html"/></row>')
+            self.assertRaises(FileNotFoundError, list, iter_render(path))
+        log(chunks[0])
+
+    def test_render_async(self):
+        log('test_render_async')
+
+        async def value(v):
+            await sleep(0.01)
+            return v
+
+        async def main():
+            context = {'name': value('a'), 'other': 'b'}
+            found = await preload('page.html', templates_path=tmp)
+            output = await render_async('page.html', context=context, templates_path=tmp)
+            chunks = [c async for c in iter_render_async(
+                'page.html', chunk_size=8, context={'name': value('a'), 'other': 'b'}, templates_path=tmp
+            )]
+            stream = iter_render_async('long.html', chunk_size=8, context={'other': 'b'}, templates_path=tmp)
+            self.assertTrue((await stream.__anext__()).startswith(b'<div class="row">'))
+            await stream.aclose()
+            with self.assertRaises(FileNotFoundError):
+                [c async for c in iter_render_async('missing.html', templates_path=tmp)]
+            return found, output, chunks
+
+        with TemporaryDirectory() as tmp:
+            makedirs(join(tmp, 'templates'))
+            with open(join(tmp, 'page.html'), 'w') as f:
+                f.write('<row>{{ name }}<include src="part.html"></include></row>')
+            with open(join(tmp, 'long.html'), 'w') as f:
+                f.write('<row>' + '<include src="part.html"/>' * 200 + '</row>')
+            with open(join(tmp, 'missing.html'), 'w') as f:
+                f.write('<row><include src="missing.html"/></row>')
+            with open(join(tmp, 'templates', 'part.html'), 'w') as f:
+                f.write('{{ other }}')
+            found, output, chunks = run(main())
+        self.assertEqual(found, {join(tmp, 'page.html'), join(tmp, 'templates', 'part.html')})
+        self.assertEqual(output, '<div class="row">\na\nb\n</div>')
+        self.assertEqual(b''.join(chunks), output.encode())
+        self.assertGreater(len(chunks), 1)
+        log(output)
+
+    def test_Profile(self):
+        log('test_Profile')
+        with TemporaryDirectory() as tmp:
+            makedirs(join(tmp, 'templates', 'includes'))
+            with open(join(tmp, 'templates', 'includes', 'menu.shtml'), 'w') as f:
+                f.write('<nav><navlink href="{{ href }}">a</navlink></nav>')
+            with open(join(tmp, 'page.html'), 'w') as f:
+                f.write('<row>{{ name }}<include src="includes/menu.shtml"/><include src="includes/menu.shtml"/></row>')
+            profile = Profile()
+            context = defaultdict(ContextItem, name='x', href='/a')
+            output = profile.render('page.html', context=context, templates_path=tmp)
+            r = _Renderer(context=defaultdict(ContextItem, name='x', href='/a'), templates_path=tmp)
+            r.render('page.html')
+        self.assertEqual(output, r.out.read())
+        stats = profile.as_dict()['stats']
+        self.assertEqual(stats['handler']['include']['count'], 2)
+        self.assertEqual(stats['handler']['nav_start']['count'], 2)
+        self.assertEqual(stats['render']['templates/includes/menu.shtml']['count'], 2)
+        self.assertGreater(stats['populate']['populate']['bytes'], 0)
+        [span] = profile.spans
+        self.assertEqual([s['name'] for s in span['children']], ['templates/includes/menu.shtml'] * 2)
+        self.assertIn('render:page.html;handler:include;render:templates/includes/menu.shtml;handler:nav_start ', profile.dump_collapsed())
+        self.assertNotIn('Profiled', type(r).__name__)
+        Profiled = Profile().instrument()
+        for _ in range(2):
+            r = Profiled(context=defaultdict(ContextItem, name='x'))
+            r.fragments = MemoryFragmentCache()
+            r.feed('<cache key="k"><p>{{ name }}</p></cache>')
+            self.assertEqual(r.out.read(), '<p >\nx\n</p>')
+        log(profile.dump_json())
+
+    def test_render_batch(self):
+        log('test_render_batch')
+        with TemporaryDirectory() as tmp:
+            path = join(tmp, 'mail.html')
+            with open(path, 'w') as f:
+                f.write('<p>Dear {{ name }},</p><set greeting="hi {{ name }}"/><row>{{ greeting }}</row>')
+            contexts = ({'name': str(i)} for i in range(50))
+            expected = [f'<p >\nDear {i},\n</p>\n<div class="row">\nhi {i}\n</div>' for i in range(50)]
+            self.assertEqual(list(render_batch(path, contexts=contexts)), expected)
+            self.assertEqual(list(render_batch(path, contexts=({'name': str(i)} for i in range(50)), processes=2, batch_size=8)), expected)
+            merge = Merge(source='<p>{{ name }}</p>')
+            self.assertEqual(merge.render({'name': 'a'}), '<p >\na\n</p>')
+            self.assertEqual(merge.render(), '<p >\n\n</p>')
+        log(expected[0])
+
+    def test_render_many(self):
+        log('test_render_many')
+        with TemporaryDirectory() as tmp:
+            path = join(tmp, 'page.html')
+            with open(path, 'w') as f:
+                f.write('<row>{{ name }}</row>')
+            names = [str(i) for i in range(20)]
+            outputs = render_many([path] * len(names), [{'name': n} for n in names], workers=4)
+        self.assertEqual(outputs, [f'<div class="row">\n{n}\n</div>' for n in names])
+        log(outputs[0])
+
+    def test_build(self):
+        log('test_build')
+        with TemporaryDirectory() as src, TemporaryDirectory() as dest:
+            for path, template in {
+                'index.html': '<row><include src="/part.html"/></row>',
+                'sub/page.html': '<p>{{ name }}</p>',
+                'templates/part.html': '<p>{{ name }}</p>',
+            }.items():
+                makedirs(dirname(join(src, path)), exist_ok=True)
+                with open(join(src, path), 'w') as f:
+                    f.write(template)
+            manifest = join(src, 'build.json')
+            results = build(dest, src=src, workers=2, context={'name': 'a'}, manifest=manifest)
+            self.assertEqual([r.path for r in results], ['index.html', join('sub', 'page.html')])
+            with open(join(dest, 'index.html')) as f:
+                self.assertEqual(f.read(), '<div class="row">\n<p >\na\n</p>\n</div>')
+            mask = umask(0)
+            umask(mask)
+            self.assertEqual(stat(join(dest, 'index.html')).st_mode & 0o777, 0o666 & ~mask)
+            self.assertEqual(sorted(listdir(dest)), ['index.html', 'sub'])
+            self.assertEqual(build(dest, src=src, incremental=True, manifest=manifest), [])
+            with open(join(src, 'templates', 'part.html'), 'a') as f:
+                f.write('<br/>')
+            self.assertEqual([r.path for r in build(dest, src=src, incremental=True, manifest=manifest)], ['index.html'])
+        log(results)
+
+    def test_cache_tag(self):
+        log('test_cache_tag')
+        template = '<row><cache key="menu" vary="lang"><p>{{ name }}</p></cache><cache key="t" ttl="0">{{ name }}</cache></row>'
+
+        def render_with(fragments, **context):
+            r = _Renderer(context=defaultdict(ContextItem, context))
+            r.fragments = fragments
+            r.render_text(template)
+            return r.out.read()
+
+        with TemporaryDirectory() as tmp:
+            for fragments in (MemoryFragmentCache(), DiskFragmentCache(tmp)):
+                self.assertEqual(render_with(fragments, name='a', lang='en'), '<div class="row">\n<p >\na\n</p>\na\n</div>')
+                self.assertEqual(render_with(fragments, name='b', lang='en'), '<div class="row">\n<p >\na\n</p>\nb\n</div>')
+                self.assertEqual(render_with(fragments, name='c', lang='fr'), '<div class="row">\n<p >\nc\n</p>\nc\n</div>')
+                fragments.clear()
+                self.assertEqual(render_with(fragments, name='d', lang='en'), '<div class="row">\n<p >\nd\n</p>\nd\n</div>')
+        memory = MemoryFragmentCache(max_size=10)
+        memory.put('a', Fragment('x' * 6))
+        memory.put('b', Fragment('y' * 6))
+        self.assertEqual((memory.get('a'), memory.get('b').text), (None, 'y' * 6))
+
+        class Incomplete(FragmentCache):
+            def get(self, key): return None
+
+        self.assertRaises(TypeError, Incomplete)
+
+        outputs = []
+        for _ in range(2):
+            r = _Renderer(context=defaultdict(ContextItem, name='a'))
+            r.fragments = memory
+            r.feed('<row><cache key="k"><p>{{ name }}</p></cache></row>')
+            outputs.append(r.out.read())
+        self.assertEqual(outputs, ['<div class="row">\n<p >\na\n</p>\n</div>'] * 2)
+
+        template = '<cache key="k"><set title="{{ name }}!"/><block name="side">{{ name }}</block></cache><p>{{ title }}</p><block name="side"/>'
+        with TemporaryDirectory() as tmp:
+            for fragments in (MemoryFragmentCache(), DiskFragmentCache(tmp)):
+                outputs = []
+                for name, render in (('a', _Renderer.feed), ('b', _Renderer.feed), ('c', _Renderer.render_text)):
+                    r = _Renderer(context=defaultdict(ContextItem, name=name))
+                    r.fragments = fragments
+                    render(r, template)
+                    outputs.append(r.out.read())
+                self.assertEqual(outputs, ['\n<p >\na!\n</p>\na'] * 3)
+                self.assertEqual(fragments.get('k').context, (('title', 'a!'),))
+
+        with TemporaryDirectory() as tmp:
+            makedirs(join(tmp, 'templates'))
+            for name, template in {
+                'a.html': '<cache key="nav"><include src="nav.html"/></cache>',
+                'b.html': '<p>b</p><cache key="nav"><include src="nav.html"/></cache>',
+                'templates/nav.html': '<include src="links.html"/>',
+                'templates/links.html': '<p>links</p>',
+            }.items():
+                with open(join(tmp, name), 'w') as f:
+                    f.write(template)
+            graphs, memory = [], MemoryFragmentCache()
+            for page in ('a.html', 'b.html'):
+                r = _Renderer(templates_path=tmp)
+                r.fragments = memory
+                r.render(page)
+                graphs.append({k: v for k, v in r.dependencies.items() if v})
+        nav, links = join(tmp, 'templates', 'nav.html'), join(tmp, 'templates', 'links.html')
+        self.assertEqual(graphs, [{join(tmp, page): {nav}, nav: {links}} for page in ('a.html', 'b.html')])
+        self.assertEqual(memory.entries.hits, 1)
+
+    def test_SourceCache(self):
+        log('test_SourceCache')
+        with TemporaryDirectory() as tmp:
+            paths = [join(tmp, f'{i}.html') for i in range(3)]
+            for validate in ('mtime', 'hash'):
+                for path in paths:
+                    with open(path, 'w') as f:
+                        f.write('<p>a</p>')
+                cache = SourceCache(max_size=16, validate=validate)
+                self.assertEqual(cache.preload(tmp, ('.html',)), 3)
+                self.assertEqual(len(cache.entries), 2)
+                self.assertEqual(cache.read(paths[2]), '<p>a</p>')
+                self.assertEqual(cache.entries.hits, 1)
+                with open(paths[2], 'w') as f:
+                    f.write('<p>ab</p>')
+                self.assertEqual(cache.read(paths[2]), '<p>ab</p>')
+        lru = LRUCache(2)
+        for i in range(3):
+            lru.put(i, str(i))
+        self.assertEqual((lru.get(0), lru.get(2)), (None, '2'))
+        log(cache.entries.size, lru.hits, lru.misses)
+
+    def test_Parser_cache(self):
+        log('test_Parser_cache')
+        with TemporaryDirectory() as tmp:
+            path = join(tmp, 'page.html')
+            with open(path, 'w') as f:
+                f.write('<div class="a"><p>b</p></div>')
+            hits, misses = tree_cache.hits, tree_cache.misses
+            trees = []
+            for copy in (False, False, True):
+                p = Parser(copy=copy)
+                p.parse(path)
+                trees.append(p.result)
+            for _ in range(2):
+                p = Parser()
+                p.parse(path)
+                self.assertEqual(str(p.result), '<div class="a" tagtype="div"><p tagtype="p">b</p></div>')
+                p.result.add_class('mutated')
+        self.assertEqual((tree_cache.hits - hits, tree_cache.misses - misses), (4, 1))
+        with TemporaryDirectory() as tmp:
+            for source in ('', 'just text'):
+                path = join(tmp, 'text.html')
+                with open(path, 'w') as f:
+                    f.write(source)
+                p = Parser()
+                p.parse(path)
+                self.assertIsNone(p.result)
+        self.assertIs(trees[0], trees[1])
+        self.assertIsNot(trees[0], trees[2])
+        self.assertEqual(repr(trees[0]), repr(trees[2]))
+        log(trees[0], method=repr)
+
+    def test_get_tag(self):
+        log('test_get_tag')
+        self.assertIs(get_tag('DIV'), Div)
+        self.assertIs(get_tag('card', default=Div), Div)
+
+        @register(name='card', namespace='x')
+        class Card(Tag): pass
+
+        self.assertIs(get_tag('X:Card'), Card)
+        self.assertIs(get_tag('card', namespace='x'), Card)
+        self.assertIs(get_tag('card'), Tag)
+        log(get_tag('x:card'))
+
+        class Badge(Tag):
+            def __init__(self, **kwargs):
+                super().__init__(**kwargs)
+                self.label = self.attrs.get('label', '')
+
+        self.assertEqual(Badge(attrs={'label': 'new'}).label, 'new')
+        self.assertFalse(hasattr(Div(), '__dict__'))
+
+    def test_lazy_tags(self):
+        log('test_lazy_tags')
+        self.assertEqual(build_index(), INDEX)
+        from html_renderer.tags import Rt
+        self.assertIs(get_tag('rt'), Rt)
+        self.assertEqual(get_tag('acronym').type, 'abbr')
+        check = (
+            'import sys, html_renderer.parser as p; p.Parser().parse_text("<p><b>x</b></p>");'
+            'print(sorted(m for m in sys.modules if m.startswith("html_renderer.tags.default.")))'
+        )
+        loaded = subprocess.run([sys.executable, '-c', check], capture_output=True, text=True, check=True,
+                                cwd=dirname(abspath(__file__))).stdout
+        self.assertEqual(loaded.strip(), str(['html_renderer.tags.default._index', 'html_renderer.tags.default.block', 'html_renderer.tags.default.text']))
+
+    def test_Tag_str(self):
+        log('test_Tag_str')
+        p = Parser()
+        p.parse_text('<div hidden><p>a &amp; b</p><br/><script>a<b</script></div>')
+        self.assertEqual(
+            str(p.result),
+            '<div hidden tagtype="div"><p tagtype="p">a &amp; b</p><br tagtype="br">'
+            '<script tagtype="script">a<b</script></div>'
+        )
+        self.assertEqual(''.join(p.result.iter_html()), str(p.result))
+        log(p.result)
+
+    def test_deep_tree(self):
+        log('test_deep_tree')
+        root = tag = Div()
+        for _ in range(50_000):
+            tag.add_child(Div())
+            tag = tag.children[0]
+        tag.add_child(Text('a'))
+        self.assertEqual(str(root), '<div>' * 50_001 + 'a' + '</div>' * 50_001)
+        self.assertEqual(next(iter_postorder(root)).content, 'a')
+        self.assertEqual(len(list(iter_preorder(root))), 50_002)
+        self.assertTrue(repr(root).endswith("Text(content='a')" + '])' * 50_001))
+        clone = root.copy()
+        self.assertEqual(len(list(iter_preorder(clone))), 50_002)
+        self.assertIsNot(next(iter_postorder(clone)), next(iter_postorder(root)))
+
+    def test_query(self):
+        log('test_query')
+        p = Parser()
+        p.parse_text(
+            '<body><nav class="sub-nav"><li id="top">a</li><li class="x">b</li></nav>'
+            '<div><li id="top">c</li></div><p/></body>'
+        )
+        self.assertEqual(str(query(p.result, 'nav.sub-nav > li#top')), '<li id="top" tagtype="li">a</li>')
+        self.assertEqual([str(t) for t in query_all(p.result, 'li + li, nav ~ p')], [
+            '<li class="x" tagtype="li">b</li>', '<p tagtype="p"></p>'
+        ])
+        self.assertEqual(len(query_all(p.result, 'body li')), 3)
+        self.assertIsNone(query(p.result, 'body > li'))
+        attrs = Attributes()
+        attrs += Class('sub-nav')
+        self.assertIs(query(p.result, attrs), query(p.result, 'nav'))
+        self.assertRaises(ValueError, query, p.result, 'li >')
+        div = query(p.result, 'div')
+        div.add_child(Tag(attrs={'tagtype': 'li', 'id': 'new'}))
+        div.children[0].attrs['class'] = ['y']
+        self.assertEqual(len(query_all(p.result, 'body li')), 4)
+        self.assertEqual(query(p.result, 'li.y').attrs['id'], 'top')
+        del div.children[0].attrs['id']
+        self.assertEqual(len(query_all(p.result, '#top')), 1)
+        index = TreeIndex.of(p.result)
+        Div().add_child(Div())
+        self.assertIs(TreeIndex.of(p.result), index)
+        nav = query(p.result, 'nav')
+        self.assertEqual(len(query_all(nav, 'li')), 2)
+        nav.children[0].add_class('z')
+        self.assertEqual(len(query_all(p.result, '.z')), 1)
+        self.assertEqual(len(query_all(nav, '.z')), 1)
+        log(query_all(p.result, 'li'))
+
+    def test_iterparse(self):
+        log('test_iterparse')
+        with TemporaryDirectory() as tmp:
+            path = join(tmp, 'export.html')
+            with open(path, 'w') as f:
+                f.write('<ul>' + ''.join(f'<li id="i{i}">item {i}<br/></li>' for i in range(500)) + '</ul>')
+            events = [(event, node) for event, node in iterparse(path, chunk_size=7)]
+            self.assertEqual(len(events), 2 + 500 * 5)
+            self.assertEqual([(e, getattr(n, 'content', None) or n.attrs.get('tagtype')) for e, n in events[:6]], [
+                ('start', 'ul'), ('start', 'li'), ('text', 'item 0'), ('start', 'br'), ('end', 'br'), ('end', 'li')
+            ])
+            parser = Parser()
+            parser.parse(path)
+            self.assertEqual(str(events[-1][1]), str(parser.result))
+            li = events[5][1]
+            self.assertEqual(str(li), '<li id="i0" tagtype="li">item 0<br tagtype="br"></li>')
+            pruned = list(iterparse(path, chunk_size=7, prune=True))
+            self.assertEqual([e for e, _ in pruned], [e for e, _ in events])
+            self.assertEqual(pruned[-1][1].children, ())
+            self.assertEqual(pruned[5][1].children, ())
+
 main()